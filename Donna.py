@@ -1,12 +1,28 @@
 import os
+import sys
 import json
+import time
 import shutil
+import argparse
 import subprocess
 
+import donnaTrace
+from atomicFiles import atomic_write_json, file_lock
+
 PRODUCT_PATH = "product.json"
 MASTER_PATH = "master.json"
 TEMPLATE_PATH = "Template.json"
 SEED_MASTER_PATH = "test.json"   # 👈 your big array file (case-001 … case-005)
+CASE_STORE_PATH = "cases.sqlite" # indexed master store; master.json is exported from it
+TICKET_PATH = "ticket.json"
+TICKETS_PATH = "tickets.jsonl"           # batch queue: one ticket object per line
+BATCH_REPORT_PATH = "batch_report.json"
+DASHBOARD_DIR = os.path.join("morgan-case-tracker", "public")
+
+# "inprocess" imports the stages and passes the product dict between them;
+# "subprocess" runs each stage script as its own Python process via product.json
+# in the case's workspace (see open_workspace).
+PIPELINE_MODE = "inprocess"
 
 MASTER_FIELDS = [
     "id",
@@ -25,10 +41,14 @@ MASTER_FIELDS = [
     "checklist"
 ]
 
-def run_script(script_name):
+# Files a --subprocess run stages in its workspace (product_raw.txt is left
+# behind for inspection when a model answer wasn't JSON)
+WORKSPACE_SCRATCH = ("ticket.json", "product.json", "case_corpus.json")
+
+def run_script(script_name, env=None):
     if os.path.exists(script_name):
         print(f"➡ Running {script_name} ...")
-        subprocess.run(["python", script_name], shell=True)
+        subprocess.run([sys.executable, script_name], env=env)
     else:
         print(f"⚠ {script_name} not found, skipping...")
 
@@ -37,8 +57,7 @@ def load_json(path):
         return json.load(f)
 
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    atomic_write_json(path, data)
 
 def _filtered_entry(product: dict) -> dict:
     entry = {}
@@ -51,62 +70,388 @@ def _filtered_entry(product: dict) -> dict:
             entry[key] = product.get(key, "")
     return entry
 
-def _upsert_by_id(master_list: list, new_entry: dict) -> list:
-    if not isinstance(master_list, list):
-        master_list = []
-    new_id = (new_entry.get("id") or "").strip()
-    if new_id:
-        for i, item in enumerate(master_list):
-            if isinstance(item, dict) and (item.get("id") or "").strip() == new_id:
-                master_list[i] = new_entry
-                return master_list
-    master_list.append(new_entry)
-    return master_list
-
-def _load_or_seed_master(master_path: str, seed_path: str) -> list:
-    """Load master.json, or if missing, seed from test.json."""
-    if os.path.exists(master_path):
-        try:
-            data = load_json(master_path)
-            return data if isinstance(data, list) else []
-        except Exception:
-            return []
-    if os.path.exists(seed_path):
-        try:
-            data = load_json(seed_path)
-            print(f"🌱 Seeded master from {seed_path}")
-            return data if isinstance(data, list) else []
-        except Exception:
-            return []
-    return []
-
-def copy_product_to_master():
-    """Upsert product.json into master.json using only MASTER_FIELDS."""
-    product = load_json(PRODUCT_PATH)
-    entry = _filtered_entry(product)
-
-    master = _load_or_seed_master(MASTER_PATH, SEED_MASTER_PATH)
-    master = _upsert_by_id(master, entry)
-    save_json(MASTER_PATH, master)
-
-    print(f"✅ Upserted case '{entry.get('id','<no id>')}' into {MASTER_PATH}")
-
-def reset_product():
-    if os.path.exists(PRODUCT_PATH):
-        os.remove(PRODUCT_PATH)
-        print("🗑 Removed old product.json")
-    shutil.copy(TEMPLATE_PATH, PRODUCT_PATH)
-    print("📄 Reset product.json using Template.json")
-
-def run_donna():
+_STORE = None
+
+def open_case_store():
+    """The process's case store; created on first use from master.json (or the test.json seed)."""
+    global _STORE
+    if _STORE is None or _STORE.path != CASE_STORE_PATH:
+        import caseStore
+        _STORE = caseStore.CaseStore(CASE_STORE_PATH, migrate_from=(MASTER_PATH, SEED_MASTER_PATH))
+    return _STORE
+
+def copy_product_to_master(product: dict = None):
+    """Upsert a product (default: product.json) into the case store using only MASTER_FIELDS."""
+    if product is None:
+        product = load_json(PRODUCT_PATH)
+    entry = _filtered_entry(product)  # idempotent, so master entries pass through too
+    open_case_store().upsert(entry)
+    print(f"✅ Upserted case '{entry.get('id','<no id>')}' into {CASE_STORE_PATH}")
+
+def open_workspace(ticket: dict) -> str:
+    """
+    Fresh private workspace for one case's --subprocess run: the ticket and
+    a product.json copied from Template.json, nothing left from earlier runs.
+    """
+    import caseIngest
+
+    ws = caseIngest.case_workspace(ticket.get("case_number", ""))
+    for name in WORKSPACE_SCRATCH + ("product_raw.txt",):
+        path = os.path.join(ws, name)
+        if os.path.exists(path):
+            os.remove(path)
+    save_json(os.path.join(ws, "ticket.json"), ticket)
+    shutil.copy(TEMPLATE_PATH, os.path.join(ws, "product.json"))
+    print(f"📄 Prepared workspace {ws}")
+    return ws
+
+def close_workspace(ws: str) -> None:
+    for name in WORKSPACE_SCRATCH:
+        path = os.path.join(ws, name)
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        os.rmdir(ws)  # kept when product_raw.txt is there to inspect
+    except OSError:
+        pass
+
+def new_product(ticket: dict) -> dict:
+    """Fresh product dict from Template.json, stamped with the ticket's id/client."""
+    product = load_json(TEMPLATE_PATH)
+    product["id"] = ticket.get("case_number", "")
+    product["client_name"] = ticket.get("client_name", "")
+    return product
+
+def prepare_case(ticket: dict, existing: dict = None):
+    """
+    GCS stage: list the case prefix, diff it against the saved manifest and
+    gather what needs prompting. Returns (plan, product, corpus, manifest):
+    plan "skip" => corpus is None and nothing needs to run; "delta" =>
+    product is seeded from `existing` and corpus holds only new/changed blobs.
+    """
+    import caseIngest
+    import caseManifest
+
+    product = new_product(ticket)
+    case_id = product["id"]
+    with donnaTrace.span("stage.prepare", case=case_id) as span:
+        bucket, prefix = caseIngest.case_location(case_id)
+        blobs = caseIngest.list_case_blobs(bucket, prefix)
+        manifest = caseManifest.build_manifest(blobs)
+        plan, names = caseManifest.plan_update(case_id, manifest, existing)
+        span.set(plan=plan, files=len(blobs))
+
+        if plan == "skip":
+            return plan, product, None, manifest
+        if plan == "delta":
+            for key in MASTER_FIELDS:
+                if key not in ("id", "client_name") and key in existing:
+                    product[key] = json.loads(json.dumps(existing[key]))
+            wanted = set(names)
+            blobs = [b for b in blobs if b.name in wanted]
+            print(f"🔁 {case_id}: {len(blobs)} new/changed file(s); updating existing summary")
+            corpus = caseIngest.build_case_corpus(bucket, prefix, blobs=blobs,
+                                                  baseline=caseIngest.baseline_from_entry(existing))
+        else:
+            corpus = caseIngest.build_case_corpus(bucket, prefix, blobs=blobs)
+        return plan, product, corpus, manifest
+
+def synthesize_case(product: dict, corpus: dict, courts) -> None:
+    """LLM stage: recordAgent then paralegal (which reuses recordAgent's answer)."""
+    import recordAgent
+    import paralegal
+
+    import caseIngest
+
+    with donnaTrace.span("stage.synthesize", case=product["id"]):
+        print("➡ Running recordAgent ...")
+        if recordAgent.fill_product(product, corpus, courts) is None:
+            print(f"⚠️ recordAgent: model output wasn’t valid JSON; wrote {caseIngest.raw_output_path(product['id'])} for inspection.")
+        print("➡ Running paralegal ...")
+        if paralegal.fill_product(product, corpus, courts) is None:
+            print(f"⚠️ paralegal: model output wasn’t valid JSON; wrote {caseIngest.raw_output_path(product['id'])} for inspection.")
+
+def notify_case(product: dict, smtp=None) -> None:
+    """
+    SMTP stage: send now, or just spool/queue when `smtp` is a
+    mailSpool.MailSpool or a MessageSender.Outbox.
+    """
+    import mailSpool
+    import MessageSender
+
+    print("➡ Running MessageSender ...")
+    with donnaTrace.span("stage.notify", case=product["id"]):
+        if isinstance(smtp, mailSpool.MailSpool):
+            MessageSender.spool_case_email(product, smtp)
+        elif isinstance(smtp, MessageSender.Outbox):
+            MessageSender.queue_case_email(product, smtp)
+        else:
+            MessageSender.send_case_email(product, session=smtp)
+
+def finish_case(product: dict, corpus: dict, manifest: dict) -> dict:
+    """Master entry for the product; records the manifest once the product is trustworthy."""
+    import caseManifest
+
+    with donnaTrace.span("stage.finish", case=product["id"]):
+        entry = _filtered_entry(product)
+        if corpus.get("llm_result") is not None or not corpus["joined_text"]:
+            failed = corpus.get("failed_files") or []
+            if failed:
+                print(f"🔁 {entry['id']}: {len(failed)} file(s) failed to read; they'll be retried next run")
+            unreadable = corpus.get("unreadable_files") or []
+            if unreadable:
+                # kept in the manifest: re-reading them can't help until they change in storage
+                print(f"⚠️ {entry['id']}: {len(unreadable)} unreadable file(s); skipped until they change")
+            caseManifest.save_manifest(entry["id"], caseManifest.without_blobs(manifest, failed), entry)
+    return entry
+
+def run_pipeline(ticket: dict, courts=None, smtp=None, existing: dict = None):
+    """
+    Run recordAgent -> paralegal -> MessageSender in this process on one
+    ticket. The corpus is gathered once and the product never touches disk;
+    storage/Gemini clients are the per-process ones from caseIngest, and
+    `smtp` (a MessageSender.SMTPSession, or a MailSpool/Outbox to hand
+    the email to) is reused when given.
+    `existing` is the case's current master entry (enables incremental
+    runs). Returns the master entry, or None when the case is unchanged.
+    """
+    import caseIngest
+
+    if courts is None:
+        courts = caseIngest.load_courts_index(caseIngest.COURTS_PATH)
+    plan, product, corpus, manifest = prepare_case(ticket, existing)
+    if plan == "skip":
+        print(f"⏭ {product['id']}: no new or changed files since last run; skipped")
+        return None
+    synthesize_case(product, corpus, courts)
+    notify_case(product, smtp)
+    return finish_case(product, corpus, manifest)
+
+def _read_tickets(path: str):
+    """Yield (line_no, ticket_or_None, error) for each non-blank JSONL line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ticket = json.loads(line)
+            except Exception as e:
+                yield line_no, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(ticket, dict) or not str(ticket.get("case_number", "")).strip():
+                yield line_no, None, "missing case_number"
+                continue
+            yield line_no, ticket, None
+
+def _batch_report(results: list, started: float, emails: list = ()) -> dict:
+    report = {
+        "tickets": len(results),
+        "succeeded": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "seconds": round(time.time() - started, 3),
+        "results": results,
+        "emails_sent": sum(1 for e in emails if e["ok"]),
+        "emails_failed": sum(1 for e in emails if not e["ok"]),
+        "emails": list(emails),
+    }
+    if donnaTrace.enabled():
+        report["trace"] = donnaTrace.snapshot()  # per-span totals and counters for the run
+    return report
+
+def start_mail_drainer(pool_size: int = None):
+    """
+    Open the mail spool and start delivering it on a background thread, so
+    cases only spool their email and never wait on SMTP. Also picks up
+    messages left pending by earlier runs.
+    """
+    import mailSpool
+    import MessageSender
+
+    outbox = MessageSender.Outbox(pool_size=pool_size)
+    return mailSpool.SpoolDrainer(MessageSender.open_mail_spool(), outbox).start()
+
+def stop_mail_drainer(drainer) -> list:
+    """Final delivery pass; returns this run's per-message results (failures stay spooled for retry)."""
+    import MessageSender
+
+    emails = drainer.stop()
+    drainer.outbox.close()
+    MessageSender.print_results(emails)
+    pending = drainer.spool.counts().get("pending", 0)
+    if pending:
+        print(f"📬 {pending} email(s) still pending in {drainer.spool.path}; "
+              f"retry later with: python MessageSender.py --drain")
+    return emails
+
+def run_batch(tickets_path: str = TICKETS_PATH) -> dict:
+    """
+    Run the in-process pipeline for every ticket in a JSONL queue, reusing
+    the GCS/Gemini clients. Emails are spooled and delivered in the background
+    over pooled connections (see start_mail_drainer). A failing ticket is
+    recorded and skipped; each finished case is upserted into the store
+    and master.json is exported once at the end.
+    """
+    import caseIngest
+
+    print(f"\n🚀 DONNA BATCH STARTED ({tickets_path})")
+    started = time.time()
+    courts = caseIngest.load_courts_index(caseIngest.COURTS_PATH)
+    store = open_case_store()
+    results = []
+
+    drainer = start_mail_drainer()
+    try:
+        for line_no, ticket, error in _read_tickets(tickets_path):
+            case_id = (ticket or {}).get("case_number", "")
+            t0 = time.time()
+            if ticket is not None:
+                print(f"\n📂 [{line_no}] {case_id}")
+                try:
+                    entry = run_pipeline(ticket, courts, smtp=drainer.spool, existing=store.get(case_id))
+                    if entry is not None:
+                        store.upsert(entry)
+                    drainer.wake()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            if error:
+                print(f"❌ [{line_no}] {case_id or '<no case>'}: {error}")
+            results.append({
+                "line": line_no,
+                "case_number": case_id,
+                "ok": error is None,
+                "error": error,
+                "seconds": round(time.time() - t0, 3),
+            })
+    finally:
+        emails = stop_mail_drainer(drainer)
+
+    publish_master()
+    donnaTrace.flush()
+
+    report = _batch_report(results, started, emails)
+    save_json(BATCH_REPORT_PATH, report)
+    print(f"🎯 DONNA BATCH COMPLETE: {report['succeeded']}/{report['tickets']} ok, "
+          f"{report['failed']} failed in {report['seconds']}s (details in {BATCH_REPORT_PATH})\n")
+    return report
+
+def refresh_master_venues() -> int:
+    """
+    Re-resolve political_reading (and a missing venue.court_type) for every
+    master entry from the compiled Courts.json index, e.g. after Courts.json
+    changed. Returns how many entries changed. Manifests saved against the
+    old entries are re-stamped so the next run still skips/deltas them.
+    """
+    import caseIngest
+    import caseManifest
+
+    index = caseIngest.load_courts_index(caseIngest.COURTS_PATH)
+    store = open_case_store()
+    entries = store.all()
+    resolved = index.resolve_many((e.get("venue") or {}).get("county", "") for e in entries)
+    changed, old_fingerprints = [], {}
+    for entry in entries:
+        venue = entry.get("venue") or {}
+        leaning, court_type = resolved[venue.get("county", "")]
+        before = (entry.get("political_reading"), venue.get("court_type"))
+        fingerprint = caseManifest.entry_fingerprint(entry)
+        if venue.get("county"):
+            entry["political_reading"] = leaning
+        if court_type and not venue.get("court_type"):
+            entry.setdefault("venue", {})["court_type"] = court_type
+        if before != (entry.get("political_reading"), (entry.get("venue") or {}).get("court_type")):
+            changed.append(entry)
+            old_fingerprints[entry["id"]] = fingerprint
+    store.upsert_many(changed)
+    # After the upsert: a crash in between leaves a mismatch, i.e. a safe full re-run
+    for entry in changed:
+        previous = caseManifest.load_manifest(entry["id"])
+        if previous is not None and previous.get("entry_fingerprint") == old_fingerprints[entry["id"]]:
+            caseManifest.save_manifest(entry["id"], previous.get("blobs") or {}, entry)
+    return len(changed)
+
+def publish_master():
+    """
+    Export the case store to master.json and the dashboard's sharded feed
+    (see dashboardFeed): compact cards per phase plus per-case details.
+    """
+    import dashboardFeed
+
+    with file_lock(MASTER_PATH):  # concurrent workers publish one at a time
+        store = open_case_store()
+        store.export_json(MASTER_PATH)
+        dashboardFeed.export_feed(store.all(), DASHBOARD_DIR)
+
+def run_donna(mode: str = PIPELINE_MODE, ticket_path: str = TICKET_PATH):
     print("\n🚀 DONNA STARTED")
-    run_script("recordAgent.py")
-    run_script("paralegal.py")
-    run_script("MessageSender.py")
-    copy_product_to_master()
-    reset_product()
-    shutil.move(r"master.json", os.path.join(r"morgan-case-tracker\public", "master.json"))
+    ticket = load_json(ticket_path)
+    if mode == "subprocess":
+        ws = open_workspace(ticket)
+        env = dict(os.environ, DONNA_WORKSPACE=ws)
+        # Stage scripts append their spans to the same trace; the metrics
+        # textfile stays this process's (a child would overwrite it)
+        env.pop(donnaTrace.METRICS_ENV, None)
+        run_script("recordAgent.py", env)
+        run_script("paralegal.py", env)
+        run_script("MessageSender.py", env)
+        copy_product_to_master(load_json(os.path.join(ws, "product.json")))
+        close_workspace(ws)
+    else:
+        drainer = start_mail_drainer(pool_size=1)
+        try:
+            entry = run_pipeline(ticket, smtp=drainer.spool,
+                                 existing=open_case_store().get(ticket.get("case_number", "")))
+            drainer.wake()
+            if entry is not None:
+                copy_product_to_master(entry)
+        finally:
+            stop_mail_drainer(drainer)
+    publish_master()
+    donnaTrace.flush()
     print("🎯 DONNA COMPLETE\n")
 
 if __name__ == "__main__":
-    run_donna()
+    parser = argparse.ArgumentParser(description="Run the Donna pipeline on ticket.json or a ticket queue.")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="run each stage script as a separate Python process (legacy mode)")
+    parser.add_argument("--ticket", default=TICKET_PATH, metavar="TICKET_JSON",
+                        help=f"ticket to run (default {TICKET_PATH}); lets several workers share a directory")
+    parser.add_argument("--batch", nargs="?", const=TICKETS_PATH, metavar="TICKETS_JSONL",
+                        help=f"process a JSONL queue of tickets (default {TICKETS_PATH})")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="with --batch: run many cases concurrently on the asyncio engine")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="always call Gemini (don't read or write the response cache)")
+    parser.add_argument("--clear-llm-cache", action="store_true",
+                        help="drop every cached Gemini response before running")
+    parser.add_argument("--refresh-venues", action="store_true",
+                        help="re-resolve political reading/court type for every master entry from Courts.json and exit")
+    parser.add_argument("--trace", metavar="TRACE_JSONL",
+                        help="append a JSON line per timed span (listing, download, PDF parse, Gemini, SMTP, ...)")
+    parser.add_argument("--metrics", metavar="PROM_FILE",
+                        help="write span totals and counters here in Prometheus textfile-collector format")
+    args = parser.parse_args()
+    if args.trace or args.metrics:
+        donnaTrace.enable(args.trace or os.environ.get(donnaTrace.TRACE_ENV),
+                          args.metrics or os.environ.get(donnaTrace.METRICS_ENV))
+        if args.trace:
+            os.environ[donnaTrace.TRACE_ENV] = args.trace  # also reaches --subprocess children
+    if args.refresh_venues:
+        n = refresh_master_venues()
+        publish_master()
+        print(f"🏛 Refreshed venue data: {n} master entr{'y' if n == 1 else 'ies'} changed")
+        sys.exit(0)
+    if args.no_llm_cache or args.clear_llm_cache:
+        import caseIngest
+        if args.clear_llm_cache:
+            caseIngest.clear_llm_cache()
+        if args.no_llm_cache:
+            caseIngest.LLM_CACHE_BYPASS = True
+            os.environ["DONNA_LLM_CACHE_BYPASS"] = "1"  # also reaches --subprocess children
+    if args.batch and args.use_async:
+        import donnaAsync
+        donnaAsync.run_batch_async(args.batch)
+    elif args.batch:
+        run_batch(args.batch)
+    else:
+        run_donna("subprocess" if args.subprocess else PIPELINE_MODE, args.ticket)
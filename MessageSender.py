@@ -1,36 +1,54 @@
 # MessageSender.py
+import os
+import time
+import queue
 import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import json
+import argparse
+from typing import List, Optional, Tuple
 
-PRODUCT_PATH = "product.json"
+import donnaTrace
+import mailSpool
 
-def main():
-    # Load case data
-    with open(PRODUCT_PATH, "r", encoding="utf-8") as file:
-        data = json.load(file)
+PRODUCT_PATH = os.path.join(os.environ.get("DONNA_WORKSPACE", ""), "product.json")  # Donna's per-case workspace
+MAIL_SPOOL_PATH = "mail_spool.sqlite"   # durable outbox; survives failed sends and re-runs
 
+# Email config — replace with your Gmail + App Password
+SENDER_EMAIL = "earistizabal102006@gmail.com"
+SENDER_PASSWORD = "dzst mdtm kmxv vvik"  # <- Paste your Gmail App Password (not your login)
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+SMTP_USE_SSL = True        # False: plain SMTP (e.g. a local aiosmtpd stand-in for tests)
+SMTP_TIMEOUT_S = 20
+
+# Outbox (batched delivery)
+SMTP_POOL_SIZE = 2         # connections kept open while flushing
+SMTP_RATE_PER_S = 2.0      # max messages per second across the pool (0 = unlimited)
+SMTP_IDLE_CHECK_S = 30     # NOOP a connection idle longer than this before reusing it
+SMTP_MAX_IDLE_S = 300      # reconnect without asking once idle this long (servers drop idle sessions)
+
+def _event_type_for(phase_norm: str) -> Optional[str]:
+    # Determine event type based on original conditions
+    if phase_norm == "discovery":
+        return "Deposition"
+    if phase_norm == "settlement discussion":
+        return "Mediation"
+    return None
+
+def build_case_email(data: dict) -> Optional[Tuple[str, MIMEMultipart]]:
+    """Build (event_type, message) for a product dict, or None when its phase needs no email."""
     # Pull fields (with safe defaults)
     litigation_phase = str(data.get("litigation_phase", "")).strip()
-    phase_norm = litigation_phase.casefold()
     client_name = data.get("client_name", "Client")
     receiver_email = data.get("client_email", "sample_email")  # fallback if missing
 
-    # Determine event type based on original conditions
-    event_type = None
-    if phase_norm == "discovery":
-        event_type = "Deposition"
-    elif phase_norm == "settlement discussion":
-        event_type = "Mediation"
-
+    event_type = _event_type_for(litigation_phase.casefold())
     if not event_type:
-        print(f"ℹ️ No email sent: litigation_phase='{litigation_phase}' does not meet conditions.")
-        return
-
-    # Email config — replace with your Gmail + App Password
-    sender_email = "earistizabal102006@gmail.com"
-    password = "dzst mdtm kmxv vvik"  # <- Paste your Gmail App Password (not your login)
+        return None
 
     subject = f"{event_type} Request"
     body = (
@@ -42,26 +60,316 @@ def main():
 
     # Create message
     message = MIMEMultipart()
-    message["From"] = sender_email
+    message["From"] = SENDER_EMAIL
     message["To"] = receiver_email
     message["Subject"] = subject
     message.attach(MIMEText(body, "plain"))
+    return event_type, message
+
+class SMTPSession:
+    """
+    One logged-in SMTP connection reused across sends (batch runs).
+    Connects lazily; a connection idle past SMTP_IDLE_CHECK_S is probed with
+    NOOP (past SMTP_MAX_IDLE_S simply replaced) before use, and a dropped
+    connection is re-established once per send. Defaults come from the
+    SMTP_* config; pass host/port/use_ssl/credentials to point elsewhere
+    (username=None skips login).
+    """
+    def __init__(self, host: str = None, port: int = None, use_ssl: bool = None,
+                 username: Optional[str] = SENDER_EMAIL, password: Optional[str] = SENDER_PASSWORD):
+        self.host = SMTP_HOST if host is None else host
+        self.port = SMTP_PORT if port is None else port
+        self.use_ssl = SMTP_USE_SSL if use_ssl is None else use_ssl
+        self.username = username
+        self.password = password
+        self.connects = 0
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT_S)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_S)
+        if self.username:
+            server.login(self.username, self.password)
+        self._server = server
+        self._last_used = time.monotonic()
+        self.connects += 1
+
+    def _drop(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _healthy(self) -> bool:
+        """Whether the open connection can be reused as is (probing it if it sat idle)."""
+        idle = time.monotonic() - self._last_used
+        if idle > SMTP_MAX_IDLE_S:
+            return False
+        if idle > SMTP_IDLE_CHECK_S:
+            try:
+                return self._server.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def send(self, message) -> dict:
+        """Send one message; returns the recipients the server refused (normally {})."""
+        try:
+            with donnaTrace.span("smtp.send") as span:
+                refused = self._send(message)
+                span.set(refused=len(refused))
+        except Exception:
+            donnaTrace.count("emails_failed")
+            raise
+        donnaTrace.count("emails_failed" if refused else "emails_sent")
+        return refused
+
+    def _send(self, message) -> dict:
+        if self._server is not None and not self._healthy():
+            self._drop()
+        for attempt in range(2):
+            if self._server is None:
+                self._connect()
+            try:
+                refused = self._server.send_message(message)
+                self._last_used = time.monotonic()
+                return refused or {}
+            except smtplib.SMTPServerDisconnected:
+                self._drop()
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class RateLimiter:
+    """Token bucket shared by threads: acquire() blocks until a send is allowed."""
+    def __init__(self, rate_per_s: float, burst: int = 1):
+        self.rate = rate_per_s
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def _is_permanent(e: Exception) -> bool:
+    # 5xx answers won't change on retry; auth failures are config, so keep retrying
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(e, "smtp_code", None)
+    return isinstance(code, int) and 500 <= code < 600 and not isinstance(e, smtplib.SMTPAuthenticationError)
+
+class Outbox:
+    """
+    Queue messages now, deliver them in one flush() over a pool of reused,
+    health-checked SMTPSessions under a shared rate limit. flush() returns
+    one result dict per message, in queue order:
+      {"key", "to", "subject", "ok", "error", "permanent", "refused", "seconds"}
+    "permanent" marks failures a retry can't fix (refused recipients, 5xx).
+    """
+    def __init__(self, pool_size: int = None, rate_per_s: float = None, session_factory=SMTPSession):
+        self.pool_size = max(1, SMTP_POOL_SIZE if pool_size is None else pool_size)
+        self.limiter = RateLimiter(SMTP_RATE_PER_S if rate_per_s is None else rate_per_s)
+        self._factory = session_factory
+        self._sessions: "queue.Queue[SMTPSession]" = queue.Queue()
+        self._created = 0
+        self._pending: List[Tuple[Optional[str], object]] = []
+        self._lock = threading.Lock()
+
+    def queue(self, message, key: Optional[str] = None) -> None:
+        with self._lock:
+            self._pending.append((key, message))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _checkout(self) -> SMTPSession:
+        try:
+            return self._sessions.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                return self._factory()
+        return self._sessions.get()
+
+    def _deliver(self, item) -> dict:
+        key, message = item
+        result = {"key": key, "to": message["To"], "subject": message["Subject"],
+                  "ok": False, "error": None, "permanent": False, "refused": {}, "seconds": 0.0}
+        self.limiter.acquire()
+        session = self._checkout()
+        t0 = time.time()
+        try:
+            refused = session.send(message)
+            result["refused"] = {k: list(v) for k, v in refused.items()} if isinstance(refused, dict) else {}
+            result["ok"] = not result["refused"]
+            if result["refused"]:
+                result["error"] = "some recipients refused"
+                result["permanent"] = True  # the others already have it; don't resend
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["permanent"] = _is_permanent(e)
+        finally:
+            result["seconds"] = round(time.time() - t0, 3)
+            self._sessions.put(session)
+        return result
+
+    def flush(self) -> List[dict]:
+        """Send everything queued so far; connections stay open for the next flush."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(batch))) as pool:
+            return list(pool.map(self._deliver, batch))
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._sessions.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def send_case_email(data: dict, session: Optional[SMTPSession] = None) -> bool:
+    """
+    In-process stage: email the client if the product's phase calls for it.
+    Pass an SMTPSession to reuse one connection across many products.
+    """
+    built = build_case_email(data)
+    if built is None:
+        litigation_phase = str(data.get("litigation_phase", "")).strip()
+        print(f"ℹ️ No email sent: litigation_phase='{litigation_phase}' does not meet conditions.")
+        return False
+    event_type, message = built
 
     # Send (SSL 465). If blocked, switch to STARTTLS 587 (see comment below).
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=20) as server:
-            server.login(sender_email, password)
-            server.send_message(message)
-        print(f"✅ Email sent to {receiver_email} ({event_type})")
+        if session is not None:
+            session.send(message)
+        else:
+            with SMTPSession() as one_off:
+                one_off.send(message)
+        print(f"✅ Email sent to {message['To']} ({event_type})")
+        return True
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
+        return False
 
     # STARTTLS alternative:
-    # with smtplib.SMTP("smtp.gmail.com", 587, timeout=20) as server:
+    # with smtplib.SMTP(SMTP_HOST, 587, timeout=20) as server:
     #     server.ehlo()
     #     server.starttls()
-    #     server.login(sender_email, password)
+    #     server.login(SENDER_EMAIL, SENDER_PASSWORD)
     #     server.send_message(message)
 
+def case_email_key(data: dict, event_type: str) -> str:
+    """Idempotency key: one email per case, event and litigation phase."""
+    phase = str(data.get("litigation_phase", "")).strip().casefold()
+    return f"{str(data.get('id', '')).strip()}|{event_type}|{phase}"
+
+def spool_case_email(data: dict, spool: mailSpool.MailSpool) -> bool:
+    """
+    Durable counterpart of send_case_email: persist the product's email
+    (if any) in the spool for a SpoolDrainer to deliver. A case/event/phase
+    that was spooled before is skipped, so re-runs never double-send.
+    """
+    built = build_case_email(data)
+    if built is None:
+        litigation_phase = str(data.get("litigation_phase", "")).strip()
+        print(f"ℹ️ No email spooled: litigation_phase='{litigation_phase}' does not meet conditions.")
+        return False
+    event_type, message = built
+    if not spool.enqueue(case_email_key(data, event_type), message):
+        print(f"↩️ {event_type} email for '{data.get('id', '')}' already spooled; not sending again")
+        return False
+    print(f"📬 Spooled {event_type} email to {message['To']}")
+    return True
+
+def open_mail_spool(path: str = None) -> mailSpool.MailSpool:
+    return mailSpool.MailSpool(MAIL_SPOOL_PATH if path is None else path)
+
+def queue_case_email(data: dict, outbox: Outbox) -> bool:
+    """Batch counterpart of send_case_email: queue the product's email (if any) on `outbox`."""
+    built = build_case_email(data)
+    if built is None:
+        litigation_phase = str(data.get("litigation_phase", "")).strip()
+        print(f"ℹ️ No email queued: litigation_phase='{litigation_phase}' does not meet conditions.")
+        return False
+    event_type, message = built
+    outbox.queue(message, key=f"{data.get('id', '')}:{event_type}")
+    print(f"📬 Queued {event_type} email to {message['To']}")
+    return True
+
+def print_results(results: List[dict]) -> None:
+    for r in results:
+        if r["ok"]:
+            print(f"✅ Email sent to {r['to']} ({r['subject']})")
+        else:
+            print(f"❌ Failed to send email to {r['to']}: {r['error']}"
+                  + ("" if r.get("permanent") else " (will retry)"))
+
+def drain_spool(max_wait_s: float = None) -> List[dict]:
+    """Deliver everything pending in the spool, waiting out backoff up to max_wait_s."""
+    with Outbox() as outbox:
+        results = mailSpool.SpoolDrainer(open_mail_spool(), outbox).drain_until_idle(max_wait_s)
+    print_results(results)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Email the client for product.json, or drain the mail spool.")
+    parser.add_argument("--drain", action="store_true",
+                        help="deliver pending spooled messages (retrying with backoff) and exit")
+    args = parser.parse_args()
+    if args.drain:
+        drain_spool()
+        return
+
+    # Load case data
+    with open(PRODUCT_PATH, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    spool = open_mail_spool()
+    if spool_case_email(data, spool):
+        # One immediate try; a failure stays spooled for `MessageSender.py --drain`
+        with Outbox() as outbox:
+            print_results(mailSpool.SpoolDrainer(spool, outbox).drain_once())
+
 if __name__ == "__main__":
     main()
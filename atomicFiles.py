@@ -0,0 +1,89 @@
+# atomicFiles.py
+# Crash- and concurrency-safe file writes for artifacts several Donna
+# workers share on one machine (master.json export, dashboard copy,
+# manifests, compiled indexes, reports).
+# - writes go to a unique temp file in the target's directory and are
+#   os.replace()d into place, so readers see the old or the new file, never
+#   a torn one, and two writers never share a temp name
+# - file_lock() serializes read-modify-write sequences across processes with
+#   an advisory lock on "<path>.lock" (fcntl on POSIX, msvcrt on Windows)
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_TIMEOUT_S = 60
+
+def safe_filename(key: str) -> str:
+    """Filesystem-safe, collision-free name for an arbitrary key (e.g. a case id)."""
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", key).strip("_") or "case"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]  # keep distinct keys distinct
+    return f"{safe}-{digest}"
+
+@contextmanager
+def file_lock(path: str, timeout_s: float = LOCK_TIMEOUT_S):
+    """Exclusive inter-process lock guarding `path` (held on a sidecar .lock file)."""
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    deadline = time.monotonic() + timeout_s
+    try:
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for lock on {path}")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_text(path: str, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+def atomic_write_json(path: str, data, indent=2) -> None:
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+def atomic_copy(src: str, dest: str) -> None:
+    with open(src, "rb") as f:
+        atomic_write_bytes(dest, f.read())
@@ -0,0 +1,205 @@
+# caseApi.py
+# Read-only HTTP API over the case store (stdlib http.server), so the
+# dashboard and other tools can read cases without the static master.json
+# dump, and several Donna workers can share one read endpoint.
+#   GET /cases?phase=Discovery&page=1&per_page=50[&view=card]
+#   GET /cases/{id}
+#   GET /changes?since=<version>[&limit=500]   delta feed for polling clients
+# Every answer is a function of the store version, so the version is the
+# ETag: a client that sends If-None-Match gets a 304 without the store
+# being queried, and nothing is serialized until a write happens. Bodies are
+# gzip'd for clients that accept it.
+#
+# Usage: python caseApi.py [--host 127.0.0.1] [--port 8765] [--store cases.sqlite]
+
+import json
+import gzip
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import caseStore
+import dashboardFeed
+
+# ------------------ CONFIG ------------------
+API_HOST         = "127.0.0.1"
+API_PORT         = 8765
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE     = 500
+MAX_CHANGES      = 500
+GZIP_MIN_BYTES   = 1024    # smaller bodies aren't worth compressing
+ALLOW_ORIGIN     = "*"     # the dashboard's dev server runs on another port
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _int_param(query: dict, name: str, default: int, lo: int, hi: Optional[int] = None) -> int:
+    raw = query.get(name, [None])[0]
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer")
+    if value < lo or (hi is not None and value > hi):
+        raise ApiError(400, f"'{name}' must be between {lo} and {hi}" if hi is not None else f"'{name}' must be >= {lo}")
+    return value
+
+def _etag(version: int, target: str) -> str:
+    # Same store version + same request => same body
+    return f'"v{version}-{hashlib.sha1(target.encode("utf-8")).hexdigest()[:12]}"'
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.strip('"')
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == bare or tag == bare + "-gzip":
+            return True
+    return False
+
+class CaseApi:
+    """Routes requests to CaseStore reads; kept apart from the handler so it can be used directly."""
+
+    def __init__(self, store: caseStore.CaseStore):
+        self.store = store
+
+    def cases(self, query: dict) -> dict:
+        phase = query.get("phase", [None])[0]
+        page = _int_param(query, "page", 1, 1)
+        per_page = _int_param(query, "per_page", DEFAULT_PER_PAGE, 1, MAX_PER_PAGE)
+        card = query.get("view", [""])[0] == "card"
+        total, entries = self.store.page(phase, (page - 1) * per_page, per_page)
+        if card:
+            entries = [dashboardFeed.card_view(e) for e in entries]
+        return {
+            "phase": phase,
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": (total + per_page - 1) // per_page,
+            "cases": entries,
+        }
+
+    def case(self, case_id: str) -> dict:
+        entry = self.store.get(case_id)
+        if entry is None:
+            raise ApiError(404, f"no case '{case_id}'")
+        return entry
+
+    def changes(self, query: dict) -> dict:
+        since = _int_param(query, "since", 0, 0)
+        limit = _int_param(query, "limit", MAX_CHANGES, 1, MAX_CHANGES)
+        rows = self.store.changes_since(since, limit + 1)
+        more = len(rows) > limit
+        if more:
+            # Only whole versions, so a client resuming from next_since never
+            # misses the rest of a batch write
+            cut = rows[limit][0]
+            rows = [r for r in rows[:limit] if r[0] < cut]
+            if not rows:  # one write larger than a page: send it whole
+                rows = [r for r in self.store.changes_since(cut - 1) if r[0] == cut]
+                more = bool(self.store.changes_since(cut, 1))  # anything newer than that write?
+        next_since = rows[-1][0] if rows else since
+        return {
+            "since": since,
+            "next_since": next_since,
+            "more": more,
+            "changes": [{"version": v, "case": entry} for v, entry in rows],
+        }
+
+    def route(self, path: str, query: dict) -> dict:
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if parts == ["cases"]:
+            return self.cases(query)
+        if len(parts) == 2 and parts[0] == "cases":
+            return self.case(parts[1])
+        if parts == ["changes"]:
+            return self.changes(query)
+        raise ApiError(404, f"no route for {path}")
+
+class _Handler(BaseHTTPRequestHandler):
+    api: CaseApi = None
+    server_version = "DonnaCaseAPI/1"
+    protocol_version = "HTTP/1.1"  # keep-alive for polling clients
+
+    def _send(self, status: int, body: bytes = b"", headers: Tuple[Tuple[str, str], ...] = ()) -> None:
+        self.send_response(status)
+        self.send_header("Access-Control-Allow-Origin", ALLOW_ORIGIN)
+        self.send_header("Access-Control-Expose-Headers", "ETag")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        etag = _etag(self.api.store.version(), self.path)
+        if _etag_matches(self.headers.get("If-None-Match"), etag):
+            self._send(304, headers=(("ETag", etag), ("Cache-Control", "no-cache"), ("Vary", "Accept-Encoding")))
+            return
+        try:
+            payload = self.api.route(url.path, parse_qs(url.query))
+            status = 200
+        except ApiError as e:
+            payload, status = {"error": str(e)}, e.status
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        headers = [("Content-Type", "application/json; charset=utf-8"), ("Vary", "Accept-Encoding")]
+        if status == 200:
+            headers.append(("Cache-Control", "no-cache"))  # cache, but revalidate with the ETag
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            headers.append(("Content-Encoding", "gzip"))
+            etag = etag[:-1] + '-gzip"'  # a different representation needs its own ETag
+        if status == 200:
+            headers.append(("ETag", etag))
+        self._send(status, body, tuple(headers))
+
+    do_HEAD = do_GET
+
+    def do_OPTIONS(self):
+        self._send(204, headers=(("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS"),
+                                 ("Access-Control-Allow-Headers", "If-None-Match")))
+
+    def log_message(self, format, *args):
+        pass  # one line per poll would drown the console
+
+def make_server(store: caseStore.CaseStore, host: str = API_HOST, port: int = API_PORT) -> ThreadingHTTPServer:
+    """A ready-to-serve API server; each request thread gets its own SQLite connection."""
+    handler = type("CaseApiHandler", (_Handler,), {"api": CaseApi(store)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    import Donna
+
+    parser = argparse.ArgumentParser(description="Serve the Donna case store over HTTP (read-only).")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--store", default=Donna.CASE_STORE_PATH, help="case store to serve")
+    args = parser.parse_args()
+    Donna.CASE_STORE_PATH = args.store
+    server = make_server(Donna.open_case_store(), args.host, args.port)
+    print(f"🌐 Serving {args.store} on http://{args.host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
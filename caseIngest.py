@@ -0,0 +1,1451 @@
+# caseIngest.py
+# Shared ingestion for recordAgent.py and paralegal.py:
+# - walks a GCS case prefix and extracts text (PDF / text-like) into one corpus
+# - persists that corpus to ./case_corpus.json so the second agent in a
+#   Donna run reuses it (and the first agent's LLM result) instead of
+#   downloading and prompting again, as long as a fresh listing of the
+#   prefix still matches the one the corpus was built from
+# - Courts.json venue resolution and the product.json merge both agents use
+# - one storage client / one Gemini model per process (get_storage_client,
+#   get_model), so Donna can run every stage in-process
+# - case files come from GCS, local disk or memory, picked per ticket by the
+#   case_number's URI scheme (case_location, caseStorage.py)
+# - listing, downloads, PDF parsing, Gemini calls and JSON repair report
+#   spans and counters to donnaTrace when tracing is on
+
+import os
+import re
+import json
+import time
+import codecs
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Optional, List, Tuple, Dict
+
+from pypdf import PdfReader
+
+import caseManifest
+import caseStorage
+import donnaTrace
+import evidenceRank
+from atomicFiles import atomic_write_json, atomic_write_text, safe_filename
+import textClean
+import textDedup
+from diskCache import DiskCache, make_key
+
+# ------------------ CONFIG ------------------
+GENAI_API_KEY = "API_KEY"  # replace if not using env var
+MODEL_NAME = "gemini-2.5-flash"
+GENERATION_CONFIG = {
+    "temperature": 0,
+    "response_mime_type": "application/json",
+}
+
+BUCKET = "knighthacks-mm"
+
+# Per-case scratch lives in its own workspace so several runs can share a box.
+# Donna sets DONNA_WORKSPACE for --subprocess stage scripts; run by hand, the
+# scripts keep using the current directory.
+WORKSPACE_ROOT = "workspaces"
+WORKSPACE      = os.environ.get("DONNA_WORKSPACE", "")
+
+def workspace_path(name: str) -> str:
+    return os.path.join(WORKSPACE, name) if WORKSPACE else name
+
+COURTS_PATH   = "Courts.json"    # county -> (leaning, court via name)
+COURTS_INDEX_PATH = os.path.join(".donna_cache", "courts_index.json")  # compiled CourtsIndex
+CORPUS_PATH   = workspace_path("case_corpus.json")  # per-run scratch shared by the two agents;
+                                                    # reused only while the case listing is unchanged
+
+MAX_CHARS_PER_FILE = 3_000
+MAX_TOTAL_CHARS    = 70_000
+# Only cases past the typical 50-300 files are map-reduced (see MAP_* below);
+# everything else is ranked-packed into MAX_TOTAL_CHARS with one Gemini call.
+# ~350 files at MAX_CHARS_PER_FILE; per-file truncation keeps smaller cases under it.
+MAP_REDUCE_THRESHOLD_CHARS = 350 * MAX_CHARS_PER_FILE
+
+MAX_DOWNLOAD_WORKERS = 8   # concurrent GCS downloads/extractions per case
+# Many cases at once (donnaAsync) also share one cap on downloads in flight
+# across the process; see shared_limits()
+
+# Map-reduce synthesis for cases whose extracted text exceeds
+# MAP_REDUCE_THRESHOLD_CHARS: file groups are summarized into compact partials
+# in parallel, then the agent's normal prompt runs over the partials instead
+# of truncated text.
+MAP_GROUP_CHARS            = 30_000                # text per map call
+MAP_CONCURRENCY            = 4                     # parallel map calls per case
+MAP_MAX_ROUNDS             = 3                     # re-map partials while they exceed MAX_TOTAL_CHARS
+
+DEDUP_NEAR_DUPLICATES = True   # drop re-scans / copies before packing (textDedup.py)
+
+# "ranked": extract every file, then pack the chunks that best match the
+# checklist/venue vocabulary (evidenceRank.py) into PACK_BUDGET_CHARS.
+# "listing": pack whole files in listing order, stopping at MAX_TOTAL_CHARS.
+EVIDENCE_PACKING  = "ranked"
+PACK_BUDGET_CHARS = MAX_TOTAL_CHARS
+
+# Text-like blobs are fetched with an HTTP range of this many bytes
+# (worst-case UTF-8 width of MAX_CHARS_PER_FILE characters).
+TEXT_RANGE_BYTES = MAX_CHARS_PER_FILE * 4
+# .json blobs up to this size are fetched whole and pretty-printed with json.dumps;
+# larger ones are range-read and re-indented on the fly.
+JSON_FULL_FETCH_MAX_BYTES = 1 * 1024 * 1024
+
+# "serial" parses PDFs in this interpreter; "process" hands them to a worker pool
+PDF_PARSE_MODE      = "serial"
+PDF_PROCESS_WORKERS = os.cpu_count() or 1
+PDF_PARSE_TIMEOUT_S = 60
+
+# Local extraction cache so unchanged blobs skip GCS + pypdf; "" disables it
+EXTRACT_CACHE_PATH      = os.path.join(".donna_cache", "extract.sqlite")
+EXTRACT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+EXTRACT_CACHE_VERSION   = "4"   # bump when extraction output changes
+
+# Gemini response cache: unchanged prompt + model + config => no API call; "" disables it
+LLM_CACHE_PATH      = os.path.join(".donna_cache", "llm.sqlite")
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LLM_CACHE_TTL_S     = 7 * 24 * 60 * 60
+LLM_CACHE_BYPASS    = os.environ.get("DONNA_LLM_CACHE_BYPASS", "") not in ("", "0")
+
+SKIP_EXTS = (
+    ".m4a", ".mp3", ".wav", ".flac",
+    ".jpg", ".jpeg", ".png", ".gif", ".heic", ".webp",
+    ".mp4", ".mov", ".avi", ".mkv",
+    ".zip", ".tar", ".gz", ".7z", ".rar",
+    ".exe", ".dll"
+)
+
+TEXT_LIKE_MIMES = {
+    "text/plain", "text/csv", "text/markdown",
+    "application/json", "application/xml",
+    "application/x-yaml", "application/yaml",
+}
+
+# ------------------ Shared clients ------------------
+# google.* are imported on first use so importing this module (e.g. from
+# Donna.py in subprocess mode) doesn't pay for them.
+_CLIENTS: Dict[str, object] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_storage_client():
+    """The GCS backend (anything with list_blobs(bucket, prefix) can stand in for it)."""
+    with _CLIENTS_LOCK:
+        if "storage" not in _CLIENTS:
+            _CLIENTS["storage"] = caseStorage.GCSBackend()
+        return _CLIENTS["storage"]
+
+def get_storage_backend(bucket: str):
+    """Backend holding `bucket`: local/in-memory for file:// and mem:// roots, else GCS."""
+    return caseStorage.backend_for(bucket) or get_storage_client()
+
+def case_location(case_number: str) -> Tuple[str, str]:
+    """(bucket, prefix) of a ticket's case_number; plain prefixes live in BUCKET."""
+    return caseStorage.case_location(case_number, BUCKET)
+
+def get_model():
+    with _CLIENTS_LOCK:
+        if "model" not in _CLIENTS:
+            if not GENAI_API_KEY or GENAI_API_KEY == "GOOGLE API KEY":
+                raise RuntimeError("Set GOOGLE_API_KEY env var or replace GENAI_API_KEY string.")
+            import google.generativeai as genai
+            genai.configure(api_key=GENAI_API_KEY)
+            _CLIENTS["model"] = genai.GenerativeModel(MODEL_NAME, generation_config=GENERATION_CONFIG)
+        return _CLIENTS["model"]
+
+# ------------------ Helpers: normalization ------------------
+def _normalize_county(s: str) -> str:
+    if not s:
+        return ""
+    s = s.strip()
+    # Normalize "St. Johns" variants
+    s = re.sub(r"\bSt\.?\s+", "St. ", s)
+    base = s
+    if base.lower().endswith(" county"):
+        base = base[:-7]
+    # alnum-only lowercase key
+    key = "".join(ch for ch in base.lower() if ch.isalnum())
+    return key
+
+def _split_county_list(s: str) -> List[str]:
+    # counties may be comma-separated or ranges like "(Circuits ...)" which we ignore
+    s = (s or "").strip()
+    if not s or s.startswith("("):
+        return []
+    return [c.strip() for c in s.split(",") if c.strip()]
+
+# ------------------ Courts.json loading & resolution ------------------
+def _load_courts(path: str) -> List[Dict[str, str]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return []
+    # Expected: {"courts": [ { "name": "...", "county": "...", "leaning": "..." }, ... ]}
+    arr = data.get("courts", []) if isinstance(data, dict) else []
+    return [x for x in arr if isinstance(x, dict)]
+
+def _parse_mixed_leaning(leaning_str: str, county: str) -> Optional[str]:
+    """
+    Handles strings like: "Mixed (e.g., Orange: Liberal, Polk: Conservative)".
+    Tries to extract the exact county's leaning if present.
+    Builds a flexible county regex for names like "St. Lucie" / "St Lucie".
+    """
+    if not leaning_str or "mixed" not in leaning_str.lower():
+        return None
+
+    county_plain = (county or "").strip()
+
+    # Build a flexible regex for the county name:
+    # If it starts with "St" variants, allow "St", "St.", and flexible spaces
+    m = re.match(r"(?i)st\.?\s*(.+)", county_plain)
+    if m:
+        rest = m.group(1)  # everything after St./St
+        county_pat = r"St\.?\s*" + re.escape(rest)
+    else:
+        county_pat = re.escape(county_plain)
+
+    # Now capture "...: LeaningWord"
+    regex = re.compile(rf"{county_pat}\s*:\s*([A-Za-z]+)", re.IGNORECASE)
+    m = regex.search(leaning_str)
+    if m:
+        return m.group(1).capitalize()
+    return None
+
+def _derive_court_type_from_name(name: str) -> str:
+    """
+    Map the 'name' field to a simple court_type label we want in product.json.
+    Priority:
+      - "* County Court" -> "County Court"
+      - "* Judicial Circuit Court" -> "Circuit Court"
+      - "District Court of Appeal" -> "District Court of Appeal"
+      - "U.S. District Court" -> "U.S. District Court"
+      - "Supreme Court" -> "Supreme Court"
+      - else -> ""
+    """
+    n = (name or "").lower()
+    if "county court" in n:
+        return "County Court"
+    if "judicial circuit court" in n or "judicial circuit" in n:
+        return "Circuit Court"
+    if "district court of appeal" in n:
+        return "District Court of Appeal"
+    if "u.s. district court" in n or "us district court" in n:
+        return "U.S. District Court"
+    if "supreme court" in n:
+        return "Supreme Court"
+    return ""
+
+COURT_TYPE_PRIORITY = ["County Court", "Circuit Court", "District Court of Appeal", "U.S. District Court", "Supreme Court"]
+
+def _resolve_politics_and_court(county: str, courts) -> Tuple[str, str]:
+    """
+    Given a county (e.g., "Putnam"), scan Courts.json and return:
+      (political_reading, court_type)
+    `courts` is a CourtsIndex (a dict lookup) or the raw _load_courts() list.
+    """
+    if isinstance(courts, CourtsIndex):
+        return courts.resolve(county)
+    if not county:
+        return "Unknown", ""
+
+    norm_target = _normalize_county(county)
+    matches: List[Dict[str, str]] = []
+
+    for rec in courts:
+        rec_counties = rec.get("county", "")
+        if rec_counties.startswith("("):
+            # skip entries like "(Circuits ...)"
+            continue
+        items = _split_county_list(rec_counties)
+        for c in items if items else [rec_counties]:
+            if _normalize_county(c) == norm_target:
+                matches.append(rec)
+                break
+
+    # Resolve leaning
+    leaning_final = "Unknown"
+    for rec in matches:
+        lean = rec.get("leaning", "")
+        parsed = _parse_mixed_leaning(lean, county)
+        if parsed:
+            leaning_final = parsed
+            break
+        if lean and "mixed" not in lean.lower():
+            leaning_final = lean
+            break
+
+    # Resolve court_type by priority
+    best_type = ""
+    for tier in COURT_TYPE_PRIORITY:
+        for rec in matches:
+            ctype = _derive_court_type_from_name(rec.get("name", ""))
+            if ctype == tier:
+                best_type = ctype
+                break
+        if best_type:
+            break
+
+    return leaning_final, best_type
+
+# ------------------ Compiled courts index ------------------
+class CourtsIndex:
+    """
+    Courts.json compiled to normalized county -> (leaning, court types in
+    COURT_TYPE_PRIORITY order), so venue resolution is a dict lookup.
+    Same answers as scanning the records with _resolve_politics_and_court,
+    with "Mixed (...)" leanings read against the county name as listed.
+    """
+    VERSION = "1"   # bump when the compiled shape or resolution rules change
+
+    def __init__(self, by_county: Dict[str, Tuple[str, List[str]]]):
+        self.by_county = by_county
+
+    @classmethod
+    def from_records(cls, courts: List[Dict[str, str]]) -> "CourtsIndex":
+        matches: Dict[str, List[Tuple[Dict[str, str], str]]] = {}
+        for rec in courts:
+            rec_counties = rec.get("county", "")
+            if rec_counties.startswith("("):
+                continue
+            items = _split_county_list(rec_counties) or [rec_counties]
+            seen = set()
+            for c in items:
+                key = _normalize_county(c)
+                if key and key not in seen:
+                    seen.add(key)
+                    matches.setdefault(key, []).append((rec, c))
+
+        by_county: Dict[str, Tuple[str, List[str]]] = {}
+        for key, recs in matches.items():
+            leaning = "Unknown"
+            for rec, name in recs:
+                lean = rec.get("leaning", "")
+                parsed = _parse_mixed_leaning(lean, name)
+                if parsed:
+                    leaning = parsed
+                    break
+                if lean and "mixed" not in lean.lower():
+                    leaning = lean
+                    break
+            types = {_derive_court_type_from_name(rec.get("name", "")) for rec, _ in recs}
+            by_county[key] = (leaning, [t for t in COURT_TYPE_PRIORITY if t in types])
+        return cls(by_county)
+
+    def lookup(self, county: str) -> Tuple[str, List[str]]:
+        """(leaning, ranked court types) for a county; ("Unknown", []) if unlisted."""
+        return self.by_county.get(_normalize_county(county), ("Unknown", []))
+
+    def resolve(self, county: str) -> Tuple[str, str]:
+        """(political_reading, court_type), like _resolve_politics_and_court."""
+        if not county:
+            return "Unknown", ""
+        leaning, types = self.lookup(county)
+        return leaning, (types[0] if types else "")
+
+    def resolve_many(self, counties) -> Dict[str, Tuple[str, str]]:
+        """county as given -> (political_reading, court_type), each distinct name resolved once."""
+        return {c: self.resolve(c) for c in dict.fromkeys(counties)}
+
+    def to_json(self) -> dict:
+        return {"version": self.VERSION, "by_county": {k: [l, t] for k, (l, t) in self.by_county.items()}}
+
+    @classmethod
+    def from_json(cls, data: dict) -> Optional["CourtsIndex"]:
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+        try:
+            return cls({k: (l, list(t)) for k, (l, t) in data["by_county"].items()})
+        except Exception:
+            return None
+
+_COURTS_INDEXES: Dict[str, Tuple[Tuple[int, int], CourtsIndex]] = {}
+_COURTS_INDEXES_LOCK = threading.Lock()
+
+def _compile_courts_index(path: str, stamp: Tuple[int, int], cache_path: str) -> CourtsIndex:
+    # The cache file is trusted when Courts.json's mtime/size match, or failing
+    # that, when its content hash does (a touched but unchanged file).
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return CourtsIndex({})
+    cached = None
+    if cache_path:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except Exception:
+            cached = None
+    if isinstance(cached, dict) and cached.get("source") == os.path.abspath(path):
+        if cached.get("stamp") == list(stamp):
+            index = CourtsIndex.from_json(cached.get("index"))
+            if index is not None:
+                return index
+    digest = hashlib.sha256(raw).hexdigest()
+    index = None
+    if isinstance(cached, dict) and cached.get("sha256") == digest:
+        index = CourtsIndex.from_json(cached.get("index"))
+    if index is None:
+        index = CourtsIndex.from_records(_load_courts(path))
+    if cache_path:
+        try:
+            atomic_write_json(cache_path, {"source": os.path.abspath(path), "stamp": list(stamp),
+                                           "sha256": digest, "index": index.to_json()}, indent=None)
+        except OSError:
+            pass
+    return index
+
+def load_courts_index(path: str = COURTS_PATH, cache_path: Optional[str] = None) -> CourtsIndex:
+    """
+    Compiled CourtsIndex for a Courts.json, memoized per process and on
+    disk (COURTS_INDEX_PATH). Rebuilt when the file's mtime/size and
+    content hash change; an unreadable file gives an empty index.
+    """
+    cache_path = COURTS_INDEX_PATH if cache_path is None else cache_path
+    try:
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return CourtsIndex({})
+    with _COURTS_INDEXES_LOCK:
+        hit = _COURTS_INDEXES.get(path)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        index = _compile_courts_index(path, stamp, cache_path)
+        _COURTS_INDEXES[path] = (stamp, index)
+        return index
+
+# ------------------ PDF parsing ------------------
+def _page_may_have_text(page) -> bool:
+    """
+    False only when the page provably can't yield text: no /Font resources
+    and no form XObjects that could carry their own (e.g. scanned images).
+    """
+    try:
+        res = page.get("/Resources")
+        if res is None:
+            return True
+        res = res.get_object()
+        if res.get("/Font"):
+            return True
+        xobjects = res.get("/XObject")
+        if xobjects:
+            for xo in xobjects.get_object().values():
+                if xo.get_object().get("/Subtype") == "/Form":
+                    return True
+        return False
+    except Exception:
+        return True
+
+def _iter_pdf_page_texts(reader):
+    """Yield each page's text lazily; text-less pages yield "" without being parsed."""
+    for p in reader.pages:
+        if not _page_may_have_text(p):
+            yield ""
+            continue
+        try:
+            yield p.extract_text() or ""
+        except Exception:
+            continue
+
+def _extract_pdf_text(stream, budget: Optional[int] = None, stats: Optional[dict] = None) -> str:
+    """
+    Noise-stripped text (textClean.clean_pages) of the first pages, sliced
+    to `budget`. Stops parsing pages once the cleaned text fills the
+    budget; cleaning is re-run only as the raw text grows geometrically,
+    so the whole walk stays linear. `stats`, if given, receives raw_chars,
+    clean_chars and the number of pages that were parsed.
+    """
+    budget = MAX_CHARS_PER_FILE if budget is None else budget
+    reader = PdfReader(stream)
+    pages: List[str] = []
+    size = 0
+    next_check = budget
+    cleaned = None
+    for text in _iter_pdf_page_texts(reader):
+        pages.append(text)
+        size += len(text) + 1
+        cleaned = None
+        if size > next_check:
+            cleaned = textClean.clean_pages(pages)
+            if len(cleaned) >= budget:
+                break
+            next_check = size + size // 2
+    if cleaned is None:
+        cleaned = textClean.clean_pages(pages)
+    if stats is not None:
+        stats["raw_chars"] = len("\n".join(pages).strip())
+        stats["clean_chars"] = len(cleaned)
+        stats["pages"] = len(pages)
+    return cleaned[:budget]
+
+def _extract_pdf_text_from_path(path: str) -> Tuple[str, dict]:
+    # Runs inside a pool worker; the PDF arrives as a temp-file path, not pickled bytes.
+    stats: dict = {}
+    with open(path, "rb") as f:
+        text = _extract_pdf_text(f, stats=stats)
+    return text, stats
+
+_PDF_POOL: Optional[ProcessPoolExecutor] = None
+_PDF_POOL_LOCK = threading.Lock()
+_PDF_SLOTS: Optional[threading.BoundedSemaphore] = None
+
+def _pdf_pool_context():
+    # The pool is created lazily from a download thread while other threads
+    # (downloads, the mail drainer, Gemini clients) run; forking a threaded
+    # process can deadlock the child, so workers come from a forkserver
+    # (spawn where there is none, e.g. Windows).
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None:
+            _PDF_POOL = ProcessPoolExecutor(max_workers=PDF_PROCESS_WORKERS, mp_context=_pdf_pool_context())
+        return _PDF_POOL
+
+def _pdf_slots() -> threading.BoundedSemaphore:
+    """One slot per pool worker, shared by every case in the process."""
+    global _PDF_SLOTS
+    with _PDF_POOL_LOCK:
+        if _PDF_SLOTS is None:
+            _PDF_SLOTS = threading.BoundedSemaphore(PDF_PROCESS_WORKERS)
+        return _PDF_SLOTS
+
+def _discard_pdf_pool(pool: ProcessPoolExecutor) -> None:
+    """Kill a pool whose worker is stuck (or already dead) so the next call gets a fresh one."""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is pool:
+            _PDF_POOL = None
+    # ProcessPoolExecutor has no public terminate before 3.14
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _parse_pdf_path_in_pool(path: str) -> Tuple[str, dict]:
+    """
+    Parse the PDF at `path` in the process pool with a per-document timeout.
+    No more documents are submitted than the pool has workers, so a
+    document never waits in the pool's queue and the timeout only covers
+    its own parse. A timeout kills the pool; other documents that were in
+    flight on it see BrokenProcessPool and are retried once on a fresh pool.
+    """
+    with _pdf_slots():
+        for attempt in range(2):
+            pool = _get_pdf_pool()
+            try:
+                return pool.submit(_extract_pdf_text_from_path, path).result(timeout=PDF_PARSE_TIMEOUT_S)
+            except BrokenProcessPool:
+                _discard_pdf_pool(pool)
+                if attempt:
+                    raise
+            except FutureTimeout:
+                _discard_pdf_pool(pool)
+                raise
+
+def _parse_pdf_in_pool(pdf_bytes: bytes) -> Tuple[str, dict]:
+    """_parse_pdf_path_in_pool for downloaded bytes, handed over as a temp file."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        return _parse_pdf_path_in_pool(path)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# ------------------ Ranged text reads ------------------
+def _blob_charset(blob) -> str:
+    m = re.search(r"charset=([\w.:-]+)", blob.content_type or "", re.IGNORECASE)
+    return m.group(1) if m else "utf-8"
+
+def _read_text_prefix(blob, max_bytes: int) -> str:
+    """
+    Fetch at most `max_bytes` from the start of the blob and decode them.
+    A multi-byte character cut by the range boundary is dropped rather
+    than raising, so the result is always a prefix of download_as_text().
+    """
+    size = getattr(blob, "size", None)
+    if size is not None and size <= max_bytes:
+        return _download_text(blob)
+    data = _download_bytes(blob, start=0, end=max_bytes - 1)
+    decoder = codecs.getincrementaldecoder(_blob_charset(blob))()
+    return decoder.decode(data, final=len(data) < max_bytes)
+
+def _reindent_json_prefix(raw: str, limit: int) -> str:
+    r"""
+    Streaming stand-in for json.dumps(json.loads(raw), indent=2) that works
+    on a truncated document: re-lays out structural characters with
+    2-space indentation and stops after `limit` output characters.
+    String contents are passed through verbatim. Anything that isn't a
+    single object/array (e.g. JSON Lines) is returned unchanged.
+    Checks (python -m doctest caseIngest.py):
+
+    >>> doc = '{"a": [], "b": { }, "c": "say \\"hi\\" {not: [json]}", "d": [1, {"e": null}]}'
+    >>> full = json.dumps(json.loads(doc), indent=2)
+    >>> _reindent_json_prefix(doc, 10_000) == full
+    True
+    >>> full.startswith(_reindent_json_prefix(doc, 20))
+    True
+    >>> _reindent_json_prefix('[1, 2, {"k": "v', 100)
+    '[\n  1,\n  2,\n  {\n    "k": "v'
+    >>> _reindent_json_prefix('{"a": 1}\n{"a": 2}\n', 100)
+    '{"a": 1}\n{"a": 2}\n'
+    >>> _reindent_json_prefix(' [ ] ', 100)
+    '[]'
+    """
+    body = raw.lstrip()
+    if not body.startswith(("{", "[")):
+        return raw
+
+    out: List[str] = []
+    out_len = 0
+    depth = 0
+    in_str = escaped = False
+    i, n = 0, len(body)
+
+    def emit(piece: str) -> None:
+        nonlocal out_len
+        out.append(piece)
+        out_len += len(piece)
+
+    while i < n and out_len < limit:
+        ch = body[i]
+        i += 1
+        if in_str:
+            emit(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch in " \t\r\n":
+            continue
+        if ch == '"':
+            in_str = True
+            emit(ch)
+        elif ch in "{[":
+            j = i
+            while j < n and body[j] in " \t\r\n":
+                j += 1
+            closer = "}" if ch == "{" else "]"
+            if j < n and body[j] == closer:
+                emit(ch + closer)
+                i = j + 1
+                if depth == 0:
+                    break
+            else:
+                depth += 1
+                emit(ch + "\n" + "  " * depth)
+        elif ch in "}]":
+            depth -= 1
+            emit("\n" + "  " * depth + ch)
+            if depth == 0:
+                break
+        elif ch == ",":
+            emit(",\n" + "  " * depth)
+        elif ch == ":":
+            emit(": ")
+        else:
+            emit(ch)
+    if depth == 0 and body[i:].strip():
+        return raw  # more than one top-level value
+    return "".join(out)
+
+# ------------------ GCS text extraction ------------------
+_DOWNLOAD_SLOTS: Optional[threading.BoundedSemaphore] = None  # None: only the per-case pool bounds downloads
+_LLM_SLOTS: Optional[threading.BoundedSemaphore] = None       # None: only MAP_CONCURRENCY bounds Gemini calls
+
+@contextmanager
+def shared_limits(downloads: int, parse_mode: str = "process", llm: Optional[int] = None):
+    """
+    Settings for running many cases in one process: at most `downloads`
+    blob downloads in flight across every case, PDFs parsed with
+    `parse_mode` ("process" submissions are already capped at the pool's
+    worker count) and, when `llm` is given, at most that many Gemini calls
+    in flight (map-reduce groups included). The previous settings are
+    restored on exit.
+    """
+    global _DOWNLOAD_SLOTS, PDF_PARSE_MODE, _LLM_SLOTS
+    saved = _DOWNLOAD_SLOTS, PDF_PARSE_MODE, _LLM_SLOTS
+    _DOWNLOAD_SLOTS = threading.BoundedSemaphore(max(1, int(downloads)))
+    PDF_PARSE_MODE = parse_mode
+    if llm is not None:
+        _LLM_SLOTS = threading.BoundedSemaphore(max(1, int(llm)))
+    try:
+        yield
+    finally:
+        _DOWNLOAD_SLOTS, PDF_PARSE_MODE, _LLM_SLOTS = saved
+
+def _download_slot():
+    slots = _DOWNLOAD_SLOTS
+    return slots if slots is not None else nullcontext()
+
+def _download_bytes(blob, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+    with _download_slot(), donnaTrace.span("storage.download", blob=blob.name) as sp:
+        data = blob.download_as_bytes() if start is None and end is None else blob.download_as_bytes(start=start, end=end)
+        sp.set(bytes=len(data))
+    donnaTrace.count("bytes_downloaded", len(data))
+    return data
+
+def _download_text(blob) -> str:
+    with _download_slot(), donnaTrace.span("storage.download", blob=blob.name):
+        text = blob.download_as_text()
+    donnaTrace.count("bytes_downloaded", getattr(blob, "size", None) or len(text))
+    return text
+
+def _open_pdf_stream(blob):
+    """Context manager yielding a seekable stream of the blob: in place when the backend can, else downloaded."""
+    opener = getattr(blob, "open_stream", None)
+    if opener is not None:
+        return opener()
+    return nullcontext(BytesIO(_download_bytes(blob)))
+
+# Parse-time failures that say nothing about the PDF itself (a dead pool
+# worker, I/O on the file or temp file, memory): reported as "Error reading"
+_TRANSIENT_PARSE_ERRORS = (BrokenProcessPool, OSError, MemoryError)
+
+def _safe_extract_text(blob, stats: Optional[dict] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (text, None) or (None, warning) for one blob. For PDFs, `stats` (if
+    given) receives the raw vs. noise-stripped character counts. A PDF
+    that pypdf can't parse gives an "Unreadable PDF" warning; download
+    and I/O errors give "Error reading" (see _TRANSIENT_WARNINGS).
+    """
+    stats = {} if stats is None else stats
+    try:
+        name = blob.name.lower()
+        if name.endswith(SKIP_EXTS):
+            return None, f"Skipped binary/media file '{blob.name}'."
+
+        mime = blob.content_type or ""
+
+        # PDF
+        if "pdf" in mime or name.endswith(".pdf"):
+            if PDF_PARSE_MODE == "process":
+                local_path = getattr(blob, "local_path", None)  # workers read local files directly
+                pdf_bytes = None if local_path else _download_bytes(blob)
+                try:
+                    with donnaTrace.span("pdf.parse", blob=blob.name, mode="process"):
+                        if local_path:
+                            text, pool_stats = _parse_pdf_path_in_pool(local_path)
+                        else:
+                            text, pool_stats = _parse_pdf_in_pool(pdf_bytes)
+                except FutureTimeout:
+                    return None, f"Timed out parsing PDF '{blob.name}' after {PDF_PARSE_TIMEOUT_S}s."
+                except _TRANSIENT_PARSE_ERRORS:
+                    raise
+                except Exception as e:
+                    return None, f"Unreadable PDF '{blob.name}': {e}"
+                stats.update(pool_stats)
+            else:
+                with _open_pdf_stream(blob) as stream:
+                    try:
+                        with donnaTrace.span("pdf.parse", blob=blob.name, mode=PDF_PARSE_MODE):
+                            text = _extract_pdf_text(stream, stats=stats)
+                    except _TRANSIENT_PARSE_ERRORS:
+                        raise
+                    except Exception as e:
+                        return None, f"Unreadable PDF '{blob.name}': {e}"
+            donnaTrace.count("pdf_pages_parsed", stats.get("pages", 0))
+            if not text:
+                return None, f"No extractable text in PDF '{blob.name}'."
+            return text[:MAX_CHARS_PER_FILE], None
+
+        # Text-like
+        if mime.startswith("text/") or mime in TEXT_LIKE_MIMES or name.endswith((".txt", ".csv", ".md", ".json", ".xml", ".yaml", ".yml")):
+            size = getattr(blob, "size", None)
+            if name.endswith(".json") and (size is None or size <= JSON_FULL_FETCH_MAX_BYTES):
+                raw = _download_text(blob)
+                try:
+                    obj = json.loads(raw)
+                    raw = json.dumps(obj, indent=2)
+                except Exception:
+                    pass
+            else:
+                raw = _read_text_prefix(blob, TEXT_RANGE_BYTES)
+                if name.endswith(".json"):
+                    raw = _reindent_json_prefix(raw, MAX_CHARS_PER_FILE)
+            return (raw[:MAX_CHARS_PER_FILE], None) if raw else (None, f"Empty text in '{blob.name}'.")
+        
+        return None, f"Skipped non-text file '{blob.name}' (content_type={mime or 'unknown'})."
+    except UnicodeDecodeError as e:
+        return None, f"Unreadable text in '{blob.name}': {e}"
+    except Exception as e:
+        return None, f"Error reading '{blob.name}': {e}"
+
+# ------------------ Extraction cache ------------------
+# Download errors and timeouts may go away on a retry; an "Unreadable ..."
+# warning (corrupt PDF, undecodable text) is a property of the blob's
+# content and is cached like any other extraction result.
+_TRANSIENT_WARNINGS = ("Error reading", "Timed out")
+_UNREADABLE_WARNINGS = ("Unreadable",)
+
+_CACHES: Dict[str, DiskCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+def _open_cache(path: str, max_bytes: int, ttl_s: Optional[float] = None) -> Optional[DiskCache]:
+    """One DiskCache per path per process; None (cache off) if path is "" or unusable."""
+    if not path:
+        return None
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            try:
+                _CACHES[path] = DiskCache(path, max_bytes, ttl_s)
+            except Exception as e:
+                print(f"⚠️ Cache {path} unavailable ({e}); continuing without it.")
+                return None
+        return _CACHES[path]
+
+def _get_extract_cache() -> Optional[DiskCache]:
+    return _open_cache(EXTRACT_CACHE_PATH, EXTRACT_CACHE_MAX_BYTES)
+
+def _extraction_cache_key(bucket: str, blob) -> Optional[str]:
+    """Content address of a blob's extraction; None if GCS gave us no generation/hash."""
+    generation = getattr(blob, "generation", None)
+    digest = getattr(blob, "md5_hash", None) or getattr(blob, "crc32c", None)
+    if not generation or not digest:
+        return None
+    return make_key("extract", EXTRACT_CACHE_VERSION, MAX_CHARS_PER_FILE,
+                    bucket, blob.name, generation, digest)
+
+def _extract_with_cache(bucket: str, blob, cache: Optional[DiskCache],
+                        stats: Optional[dict] = None) -> Tuple[Optional[str], Optional[str], Optional[bool]]:
+    """
+    _safe_extract_text behind the cache. Returns (text, warn, hit) where hit
+    is None when the blob wasn't looked up (no cache, no key, or media file).
+    Transient failures (download errors, timeouts) are never cached. `stats` gets
+    the noise-stripping counts, from the cache entry on a hit.
+    """
+    stats = {} if stats is None else stats
+    key = None
+    if cache is not None and not blob.name.lower().endswith(SKIP_EXTS):
+        key = _extraction_cache_key(bucket, blob)
+    if key is None:
+        text, warn = _safe_extract_text(blob, stats)
+        return text, warn, None
+
+    try:
+        cached = cache.get(key)
+    except Exception:
+        cached = None
+    if cached is not None:
+        stats.update(cached.get("stats") or {})
+        return cached.get("text"), cached.get("warn"), True
+
+    text, warn = _safe_extract_text(blob, stats)
+    if not (warn and warn.startswith(_TRANSIENT_WARNINGS)):
+        try:
+            cache.put(key, {"text": text, "warn": warn, "stats": stats})
+        except Exception:
+            pass
+    return text, warn, False
+
+def _chunk_header(blob) -> str:
+    return f"[FILE {blob.name}]\n"
+
+def list_case_blobs(bucket: str, prefix: str) -> list:
+    with donnaTrace.span("storage.list", bucket=bucket, prefix=prefix) as sp:
+        blobs = list(get_storage_backend(bucket).list_blobs(bucket, prefix=prefix))
+        sp.set(blobs=len(blobs))
+    return blobs
+
+def gather_case_text(bucket: str, prefix: str, max_workers: int = MAX_DOWNLOAD_WORKERS, blobs=None) -> dict:
+    """
+    Download + extract every blob under the prefix (or just `blobs`, an
+    already-listed subset) with up to `max_workers` downloads in flight,
+    consuming results in listing order so the output is identical to a
+    serial walk. With EVIDENCE_PACKING = "ranked" every file is extracted
+    and evidenceRank packs the best chunks; in "listing" mode files are
+    packed whole and scheduling stops once the remaining MAX_TOTAL_CHARS
+    budget can't fit even a one-character chunk. Near-duplicates of an
+    earlier file are dropped first (DEDUP_NEAR_DUPLICATES).
+    "documents" lists every (name, text) that was extracted and kept;
+    "failed_files" the names whose extraction failed transiently (download errors,
+    timeouts), which a retry may still read; "unreadable_files" those whose
+    content can't be read (corrupt PDF, undecodable text) until it changes.
+    """
+    with donnaTrace.span("gather", bucket=bucket, prefix=prefix) as span:
+        corpus = _gather_case_text(bucket, prefix, max_workers, blobs)
+        span.set(files=corpus["files_processed"], chars=len(corpus["joined_text"]))
+    return corpus
+
+def _gather_case_text(bucket: str, prefix: str, max_workers: int, blobs) -> dict:
+    if blobs is None:
+        blobs = list_case_blobs(bucket, prefix)
+    cache = _get_extract_cache()
+    ranked = EVIDENCE_PACKING == "ranked"
+    parts: List[str] = []
+    documents: List[Tuple[str, str]] = []
+    notes: List[str] = []
+    failed_files: List[str] = []
+    unreadable_files: List[str] = []
+    files_processed = 0
+    total = 0
+    cache_hits = cache_misses = 0
+    dedup = textDedup.NearDupIndex() if DEDUP_NEAR_DUPLICATES else None
+    dropped: List[Tuple[str, str, float, int]] = []
+    seen_files = 0
+    raw_chars = clean_chars = cleaned_files = 0
+
+    workers = max(1, int(max_workers or 1))
+    blobs = iter(blobs)
+    pending = deque()  # (blob, future, stats) in listing order; future None => budget full
+    budget_full = False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def _schedule():
+            nonlocal budget_full
+            while not budget_full and len(pending) < workers * 2:
+                blob = next(blobs, None)
+                if blob is None:
+                    return
+                if not ranked and total + len(_chunk_header(blob)) + 1 > MAX_TOTAL_CHARS:
+                    budget_full = True
+                    pending.append((blob, None, None))
+                    return
+                file_stats: dict = {}
+                pending.append((blob, pool.submit(_extract_with_cache, bucket, blob, cache, file_stats), file_stats))
+
+        _schedule()
+        while pending:
+            blob, fut, file_stats = pending.popleft()
+            if fut is None:
+                notes.append("Reached MAX_TOTAL_CHARS cap; remaining files omitted from prompt.")
+                break
+
+            text, warn, hit = fut.result()
+            if hit is True:
+                cache_hits += 1
+            elif hit is False:
+                cache_misses += 1
+            if "raw_chars" in file_stats:
+                cleaned_files += 1
+                raw_chars += file_stats["raw_chars"]
+                clean_chars += file_stats["clean_chars"]
+
+            dup = None
+            if text and not warn:
+                seen_files += 1
+                if dedup is not None:
+                    dup = dedup.add(blob.name, text)
+
+            if warn:
+                notes.append(warn)
+                if warn.startswith(_TRANSIENT_WARNINGS):
+                    failed_files.append(blob.name)
+                elif warn.startswith(_UNREADABLE_WARNINGS):
+                    unreadable_files.append(blob.name)
+            elif not text:
+                notes.append(f"No text from '{blob.name}'.")
+            elif dup is not None:
+                dropped.append((blob.name, dup[0], dup[1], len(text)))
+            elif ranked:
+                documents.append((blob.name, text))
+            else:
+                documents.append((blob.name, text))
+                chunk = _chunk_header(blob) + text
+                if total + len(chunk) > MAX_TOTAL_CHARS:
+                    notes.append("Reached MAX_TOTAL_CHARS cap; remaining files omitted from prompt.")
+                    break
+
+                parts.append(chunk)
+                total += len(chunk)
+                files_processed += 1
+
+            _schedule()
+
+        for _, fut, _ in pending:
+            if fut is not None:
+                fut.cancel()
+
+    if cache is not None:
+        notes.append(f"Extraction cache: {cache_hits} hits, {cache_misses} misses.")
+    if raw_chars:
+        notes.append(
+            f"Noise stripping: {raw_chars} -> {clean_chars} chars over {cleaned_files} PDFs "
+            f"(compression ratio {clean_chars / raw_chars:.2f})."
+        )
+    notes.extend(textDedup.dedup_notes(dropped, seen_files))
+
+    if ranked:
+        joined_text, stats = evidenceRank.pack_ranked(documents, PACK_BUDGET_CHARS)
+        files_processed = stats["files_packed"]
+        notes.append(
+            f"Ranked packing: {stats['chunks_packed']}/{stats['chunks_total']} chunks from "
+            f"{stats['files_packed']}/{len(documents)} files ({stats['chars_packed']} chars)."
+        )
+        if stats["chunks_packed"] < stats["chunks_total"]:
+            notes.append("Reached PACK_BUDGET_CHARS cap; lowest-ranked chunks omitted from prompt.")
+    else:
+        joined_text = "\n\n".join(parts)
+
+    donnaTrace.count("extract_cache_hits", cache_hits)
+    donnaTrace.count("extract_cache_misses", cache_misses)
+    donnaTrace.count("chars_packed", len(joined_text))
+    return {
+        "joined_text": joined_text,
+        "notes": notes,
+        "files_processed": files_processed,
+        "documents": documents,
+        "failed_files": failed_files,
+        "unreadable_files": unreadable_files,
+    }
+
+# ------------------ JSON-only LLM call ------------------
+def _extract_json_block(text: str) -> str:
+    if not text:
+        return ""
+    t = text.strip()
+    # strip triple-fence wrappers
+    t = re.sub(r"^```(?:json)?\s*", "", t, flags=re.IGNORECASE)
+    t = re.sub(r"\s*```$", "", t)
+    # grab first {...}
+    start = t.find("{")
+    end   = t.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        return t[start:end+1]
+    return t
+
+def _get_llm_cache() -> Optional[DiskCache]:
+    return _open_cache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_S)
+
+def _llm_cache_key(prompt: str, prompt_version: str) -> str:
+    # The full prompt covers both the template text and the case text, so an
+    # edited template misses on its own; prompt_version forces a miss for
+    # changes the text doesn't show (e.g. new post-processing of the answer).
+    return make_key("llm", MODEL_NAME, json.dumps(GENERATION_CONFIG, sort_keys=True),
+                    prompt_version, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+def clear_llm_cache() -> None:
+    cache = _get_llm_cache()
+    if cache is not None:
+        cache.clear()
+
+def _llm_slot():
+    slots = _LLM_SLOTS
+    return slots if slots is not None else nullcontext()
+
+def generate_json(prompt: str, prompt_version: str = "") -> str:
+    """
+    Send a prompt to Gemini in JSON mode (temperature 0) and return the raw text.
+    Answers that parse as JSON are cached (LLM_CACHE_*) unless LLM_CACHE_BYPASS.
+    """
+    cache = None if LLM_CACHE_BYPASS else _get_llm_cache()
+    key = _llm_cache_key(prompt, prompt_version) if cache is not None else None
+    if key is not None:
+        try:
+            cached = cache.get(key)
+        except Exception:
+            cached = None
+        if cached is not None:
+            donnaTrace.count("llm_cache_hits")
+            return cached["text"]
+        donnaTrace.count("llm_cache_misses")
+
+    with _llm_slot(), donnaTrace.span("gemini.generate", prompt_version=prompt_version, prompt_chars=len(prompt)) as sp:
+        resp = get_model().generate_content(prompt)
+        text = (resp.text or "").strip()
+        sp.set(response_chars=len(text))
+    donnaTrace.count("llm_calls")
+    donnaTrace.count("prompt_chars", len(prompt))
+
+    if key is not None and _parse_json(text)[0] is not None:
+        try:
+            cache.put(key, {"text": text, "model": MODEL_NAME, "prompt_version": prompt_version})
+        except Exception:
+            pass
+    return text
+
+def _parse_json(raw: str) -> Tuple[Optional[dict], bool]:
+    """(parsed or None, whether the fenced/prose-wrapped fallback was needed)."""
+    try:
+        return json.loads(raw), False
+    except Exception:
+        candidate = _extract_json_block(raw)
+        try:
+            return json.loads(candidate), True
+        except Exception:
+            return None, True
+
+def parse_llm_json(raw: str) -> Optional[dict]:
+    """json.loads with a fenced/prose-wrapped fallback; None if neither parses."""
+    with donnaTrace.span("llm.parse_json", chars=len(raw or "")) as sp:
+        obj, repaired = _parse_json(raw)
+        sp.set(repaired=repaired, ok=obj is not None)
+    if repaired:
+        donnaTrace.count("json_repairs")
+        if obj is None:
+            donnaTrace.count("json_parse_failures")
+    return obj
+
+# ------------------ Delta (incremental) synthesis ------------------
+DELTA_PROMPT_VERSION = "1"
+
+# Fields of an existing record the delta prompt carries forward
+BASELINE_FIELDS = (
+    "main_summary", "key_findings", "hipaa_necessity", "medical_history_summary",
+    "litigation_phase", "status", "venue", "checklist",
+)
+
+def baseline_from_entry(entry: dict) -> dict:
+    return {k: entry.get(k) for k in BASELINE_FIELDS if k in entry}
+
+def run_delta_synthesis(baseline: dict, new_text: str) -> str:
+    """
+    Ask Gemini to update an existing record using ONLY newly added/changed
+    documents. Same JSON shape as the full prompt, so the result goes
+    through the normal merge.
+    """
+    prompt = f"""
+You are "Synthia", an AI legal assistant, UPDATING an existing case record.
+
+CURRENT RECORD is what earlier documents already established. The text between TEXT START / TEXT END comes ONLY from documents added or changed since then.
+Return a SINGLE JSON object with EXACTLY the keys of CURRENT RECORD (same types), with "political_reading" set to "".
+
+RULES:
+- Return JSON ONLY (no prose, no markdown, no extra fields).
+- Keep every CURRENT RECORD value unless the new text clearly changes or extends it.
+- "main_summary": 8 words or less; rewrite only if the new text changes the essence or outcome of the case.
+- "key_findings": exactly 3 strings; replace a finding only with a more important one from the new text.
+- "litigation_phase": one of ["Discovery", "Settlement Discussion", "Pre-Trial", "Trial"]; advance it only if the new text shows the case moved on.
+- "checklist": same structure; set an item true ONLY where the new text clearly confirms it. Never change a true item to false.
+- Be faithful to the text; do not invent facts.
+
+CURRENT RECORD:
+{json.dumps(baseline, indent=2)}
+
+TEXT START
+{new_text}
+TEXT END
+"""
+    return generate_json(prompt, f"delta/{DELTA_PROMPT_VERSION}")
+
+def _true_checklist_items(checklist) -> Dict:
+    # A delta only adds evidence, so only confirmations are merged
+    if not isinstance(checklist, dict):
+        return {}
+    return {
+        section: {task: True for task, val in tasks.items() if val is True}
+        for section, tasks in checklist.items() if isinstance(tasks, dict)
+    }
+
+# ------------------ Map-reduce synthesis ------------------
+MAP_PROMPT_VERSION = "1"
+
+def run_map_synthesis(group_text: str) -> str:
+    """
+    Ask Gemini for a compact partial summary of one file group (or of
+    earlier partials). The reduce step feeds these to the agent's prompt.
+    """
+    prompt = f"""
+You are "Synthia", an AI legal assistant, summarizing ONE PART of a large case file for a later pass that sees every part.
+
+USING ONLY the text between TEXT START / TEXT END, return a SINGLE JSON object with EXACTLY these keys:
+{{
+  "facts": ["string"],
+  "medical": "string",
+  "hipaa": "string",
+  "litigation_signals": ["string"],
+  "status": "string",
+  "county": "string",
+  "checklist_evidence": {{"<checklist section>": {{"<checklist item>": true}}}}
+}}
+
+RULES:
+- Return JSON ONLY (no prose, no markdown, no extra fields).
+- "facts": at most 6 short outcome/liability/damages-oriented facts, each naming its source file if known.
+- "medical": diagnoses/treatment in one or two sentences; "" if none.
+- "hipaa": what medical records collection this part implies; "" if none.
+- "litigation_signals": dated procedural events (discovery responses, deposition notices, mediation, motions, trial dates, payments).
+- "status" and "county": only if stated; else "".
+- "checklist_evidence": only items from the checklist below that this text clearly confirms, set to true; {{}} if none.
+  Discovery: "Medical record summary has been received and summarized", "Defendant responded to the discovery request", "Did we respond to defendants discovery request", "Scheduled Defendant Deposition", "Scheduled Plaintiff Deposition", "Do we need to bring in an expert"
+  Settlement Discussion: "Have depositions been transcripted and summarized", "Has mediation been scheduled", "Have we scheduled a talk with the client"
+  Pre-Trial: "Do we have certified copies of records", "Client and experts are notified", "Prepared trial notebook", "Prepare jury charges, motions, and pretrial order"
+  Trial: "Payment received"
+- Be faithful to the text; do not invent facts.
+
+TEXT START
+{group_text}
+TEXT END
+"""
+    return generate_json(prompt, f"map/{MAP_PROMPT_VERSION}")
+
+def _group_texts(items: List[Tuple[str, str]], group_chars: int) -> List[List[Tuple[str, str]]]:
+    # Greedy listing-order groups of ~group_chars; an oversized item gets its own group
+    groups: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    size = 0
+    for name, text in items:
+        cost = len(name) + len(text) + 10
+        if current and size + cost > group_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append((name, text[:group_chars]))
+        size += cost
+    if current:
+        groups.append(current)
+    return groups
+
+def _map_group(group: List[Tuple[str, str]]) -> Tuple[str, Optional[dict]]:
+    text = "\n\n".join(f"[FILE {name}]\n{body}" for name, body in group)
+    partial = parse_llm_json(run_map_synthesis(text))
+    if not isinstance(partial, dict):
+        # Keep the group's best evidence rather than dropping it
+        packed, _ = evidenceRank.pack_ranked(group, MAP_GROUP_CHARS // 10)
+        return packed, None
+    return json.dumps(partial, ensure_ascii=False, separators=(",", ":")), partial
+
+def map_reduce_text(documents: List[Tuple[str, str]], notes: Optional[List[str]] = None) -> Tuple[str, Dict]:
+    """
+    Condense `documents` ([(name, text)]) into partial summaries, MAP_CONCURRENCY
+    map calls at a time, re-mapping the partials until they fit in
+    MAX_TOTAL_CHARS (at most MAP_MAX_ROUNDS rounds). Returns (text for the
+    reduce prompt, checklist items any partial confirmed).
+    """
+    items = [(name, text) for name, text in documents]
+    confirmed: Dict = {}
+    calls = failed = rounds = 0
+    with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+        while rounds < MAP_MAX_ROUNDS:
+            rounds += 1
+            groups = _group_texts(items, MAP_GROUP_CHARS)
+            results = list(pool.map(_map_group, groups))
+            calls += len(groups)
+            items = []
+            for i, (group, (text, partial)) in enumerate(zip(groups, results), 1):
+                label = group[0][0] if len(group) == 1 else f"{group[0][0]} .. {group[-1][0]}"
+                items.append((f"PART {rounds}.{i}: {label}", text))
+                if partial is None:
+                    failed += 1
+                else:
+                    confirmed = _deep_merge_checklist(confirmed, _true_checklist_items(partial.get("checklist_evidence")))
+            joined = "\n\n".join(f"[{name}]\n{text}" for name, text in items)
+            if len(joined) <= MAX_TOTAL_CHARS or len(items) == 1:
+                break
+    if len(joined) > MAX_TOTAL_CHARS:
+        joined, _ = evidenceRank.pack_ranked(items, MAX_TOTAL_CHARS)
+    if notes is not None:
+        notes.append(
+            f"Map-reduce: {len(documents)} files -> {len(items)} partials in {rounds} round(s), "
+            f"{calls} map calls ({failed} fell back to ranked excerpts)."
+        )
+    return joined, confirmed
+
+def _prompt_text(corpus: dict) -> Tuple[str, Dict]:
+    """
+    Text the synthesis prompt sees: the packed joined_text, or the map-reduced
+    partials once the extracted documents exceed MAP_REDUCE_THRESHOLD_CHARS.
+    Computed once per corpus so both agents prompt on the same text.
+    """
+    if "reduced_text" in corpus:
+        return corpus["reduced_text"], corpus.get("map_checklist") or {}
+    documents = corpus.get("documents") or []
+    if sum(len(text) for _, text in documents) <= MAP_REDUCE_THRESHOLD_CHARS:
+        return corpus["joined_text"], {}
+    text, confirmed = map_reduce_text(documents, corpus.setdefault("notes", []))
+    corpus["reduced_text"] = text
+    corpus["map_checklist"] = confirmed
+    return text, confirmed
+
+def synthesize_corpus(corpus: dict, full_synthesis) -> Tuple[Optional[dict], str]:
+    """
+    Prompt for a corpus: the delta prompt when it carries a baseline, else
+    `full_synthesis(case_text)` (the agent's own prompt). Large corpora are
+    map-reduced first (see _prompt_text). Returns (llm_obj or None if not
+    JSON, raw model text).
+    """
+    baseline = corpus.get("baseline")
+    text, confirmed = _prompt_text(corpus)
+    if baseline:
+        raw = run_delta_synthesis(baseline, text)
+    else:
+        raw = full_synthesis(text)
+    llm_obj = parse_llm_json(raw)
+    if llm_obj is not None and baseline:
+        llm_obj["checklist"] = _true_checklist_items(llm_obj.get("checklist"))
+    if llm_obj is not None and confirmed:
+        # Evidence a map call confirmed survives a reduce that lost it
+        checklist = llm_obj.get("checklist") if isinstance(llm_obj.get("checklist"), dict) else {}
+        llm_obj["checklist"] = _deep_merge_checklist(checklist, confirmed)
+    return llm_obj, raw
+
+# ------------------ Merge into product.json ------------------
+def _ensure_3_findings(lst) -> List[str]:
+    if not isinstance(lst, list):
+        return ["", "", ""]
+    out = [("" if x is None else str(x)) for x in lst]
+    if len(out) < 3:
+        out = (out + ["", "", ""])[:3]
+    elif len(out) > 3:
+        out = out[:3]
+    return out
+
+def _coerce_str(x) -> str:
+    return "" if x is None else str(x)
+
+def _deep_merge_checklist(base: Dict, new: Dict) -> Dict:
+    """
+    Deep-merge checklist booleans: overwrite only matching keys;
+    keep structure and unrelated keys intact.
+    """
+    if not isinstance(new, dict):
+        return base
+    for section, tasks in new.items():
+        if not isinstance(tasks, dict):
+            continue
+        base.setdefault(section, {})
+        for task, val in tasks.items():
+            if isinstance(val, bool):
+                base[section][task] = val
+    return base
+
+def load_product(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_product(path: str, product: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(product, f, indent=2)
+
+def _merge_into_product(product: dict, llm_obj: dict, courts: List[Dict[str, str]]) -> dict:
+    """
+    Overwrite ONLY selected fields of an in-memory product.
+    Also set political_reading & (if needed) court_type from Courts.json via venue.county.
+    Merge checklist booleans from model output.
+    """
+    # Read LLM values
+    main_summary            = _coerce_str(llm_obj.get("main_summary"))
+    key_findings            = _ensure_3_findings(llm_obj.get("key_findings", []))
+    hipaa_necessity         = _coerce_str(llm_obj.get("hipaa_necessity"))
+    medical_history_summary = _coerce_str(llm_obj.get("medical_history_summary"))
+    litigation_phase        = _coerce_str(llm_obj.get("litigation_phase"))
+    status                  = _coerce_str(llm_obj.get("status")) or "Pending"
+
+    venue_in = llm_obj.get("venue") or {}
+    court_type_in = _coerce_str(venue_in.get("court_type"))
+    county_in     = _coerce_str(venue_in.get("county"))
+
+    # Resolve from Courts.json
+    leaning, mapped_court = _resolve_politics_and_court(county_in, courts)
+    court_type_final = court_type_in or mapped_court
+
+    # Apply core fields
+    product["main_summary"] = main_summary
+    product["key_findings"] = key_findings
+    product["hipaa_necessity"] = hipaa_necessity
+    product["medical_history_summary"] = medical_history_summary
+    product["political_reading"] = leaning or "Unknown"
+    product["litigation_phase"] = litigation_phase
+    product["status"] = status
+
+    product.setdefault("venue", {})
+    product["venue"]["court_type"] = court_type_final
+    product["venue"]["county"] = county_in
+
+    # Checklist merge
+    model_checklist = llm_obj.get("checklist", {})
+    product.setdefault("checklist", {})
+    product["checklist"] = _deep_merge_checklist(product["checklist"], model_checklist)
+    return product
+
+def _merge_into_template(template_path: str, llm_obj: dict, courts: List[Dict[str, str]]) -> dict:
+    """Load product.json, merge the LLM object into it (see _merge_into_product), and save."""
+    product = _merge_into_product(load_product(template_path), llm_obj, courts)
+    save_product(template_path, product)
+    return product
+
+def _fill_venue_only(product: dict, courts: List[Dict[str, str]]) -> dict:
+    """No text to prompt on: still fill politics/court from a county already in the product."""
+    county_in = product.get("venue", {}).get("county", "")
+    leaning, mapped_court = _resolve_politics_and_court(county_in, courts)
+    if leaning:
+        product["political_reading"] = leaning
+    if mapped_court and not product.get("venue", {}).get("court_type"):
+        product["venue"]["court_type"] = mapped_court
+    return product
+
+# ------------------ Case workspaces ------------------
+def case_workspace(case_id: str) -> str:
+    """This case's private scratch directory under WORKSPACE_ROOT (created on demand)."""
+    path = os.path.join(WORKSPACE_ROOT, safe_filename(case_id or ""))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def raw_output_path(case_id: str) -> str:
+    """Where save_raw_output keeps a case's unparseable model answer."""
+    return workspace_path("product_raw.txt") if WORKSPACE else os.path.join(case_workspace(case_id), "product_raw.txt")
+
+def save_raw_output(case_id: str, raw: str) -> str:
+    """Keep a model answer that wasn't valid JSON for inspection; returns where it went."""
+    path = raw_output_path(case_id)
+    atomic_write_text(path, raw)
+    return path
+
+# ------------------ Shared case corpus ------------------
+def _read_corpus(bucket: str, prefix: str, listing: str) -> Optional[dict]:
+    try:
+        with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(corpus, dict):
+        return None
+    if corpus.get("bucket") != bucket or corpus.get("prefix") != prefix:
+        return None
+    if corpus.get("listing") != listing:
+        return None  # files landed, changed or went away since it was built
+    return corpus
+
+def save_case_corpus(corpus: dict) -> None:
+    atomic_write_json(CORPUS_PATH, corpus, indent=None)
+
+def build_case_corpus(bucket: str, prefix: str, blobs=None, baseline: Optional[dict] = None) -> dict:
+    """
+    One GCS walk for the case (or over `blobs` only). Shape is
+    gather_case_text()'s plus bucket/prefix/built_at, "baseline" (the
+    existing record a delta run updates, else None) and, once an agent
+    has prompted, "llm_result".
+    """
+    corpus = gather_case_text(bucket, prefix, blobs=blobs)
+    corpus.update({"bucket": bucket, "prefix": prefix, "built_at": time.time(), "baseline": baseline})
+    return corpus
+
+def load_case_corpus(bucket: str, prefix: str) -> dict:
+    """
+    File-backed build_case_corpus: reuse ./case_corpus.json (and its
+    llm_result) if it was built from the same listing as the prefix has
+    now, i.e. by the other agent this run.
+    """
+    blobs = list_case_blobs(bucket, prefix)
+    listing = caseManifest.listing_fingerprint(caseManifest.build_manifest(blobs))
+    corpus = _read_corpus(bucket, prefix, listing)
+    if corpus is not None:
+        print(f"♻️ Reusing case corpus from {CORPUS_PATH}")
+        return corpus
+    corpus = build_case_corpus(bucket, prefix, blobs=blobs)
+    corpus["listing"] = listing
+    save_case_corpus(corpus)
+    return corpus
+
+def record_llm_result(corpus: dict, llm_obj: dict, agent: str) -> None:
+    """Record an agent's parsed LLM output on the shared corpus for later agents."""
+    corpus["llm_result"] = llm_obj
+    corpus["llm_agent"] = agent
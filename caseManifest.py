@@ -0,0 +1,95 @@
+# caseManifest.py
+# Per-case blob manifests for incremental runs. After a successful run Donna
+# saves, next to master.json, which blobs (name -> generation/size/md5) the
+# case's master entry was built from. The next run lists the prefix, diffs
+# against that manifest and either
+#   - skips the case (nothing changed and the master entry is the one we built),
+#   - re-summarizes only the new/changed blobs with a delta prompt, or
+#   - falls back to a full run (first run, blobs removed, or no usable entry).
+# Blobs whose extraction failed transiently (download errors, timeouts) are
+# left out of the saved manifest, so the next run picks them up as added.
+# Permanently unreadable blobs (e.g. a corrupt PDF) stay in it under their
+# generation, so they don't force a delta run until they're rewritten.
+
+import os
+import json
+import time
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from atomicFiles import atomic_write_json, safe_filename
+
+MANIFEST_DIR = "manifests"
+
+def _manifest_path(case_id: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{safe_filename(case_id)}.json")
+
+def build_manifest(blobs) -> Dict[str, dict]:
+    """name -> {generation, size, md5} for a blob listing."""
+    out: Dict[str, dict] = {}
+    for b in blobs:
+        out[b.name] = {
+            "generation": str(getattr(b, "generation", "") or ""),
+            "size": getattr(b, "size", None),
+            "md5": getattr(b, "md5_hash", None) or getattr(b, "crc32c", None),
+        }
+    return out
+
+def without_blobs(manifest: Dict[str, dict], names) -> Dict[str, dict]:
+    """
+    The manifest minus `names`, i.e. blobs whose extraction failed
+    transiently: left out, they come back as "added" on the next run
+    instead of being skipped until they change in storage. Don't pass
+    unreadable blobs here; they'd be re-read (and fail) on every run.
+    """
+    names = set(names or ())
+    return {n: v for n, v in manifest.items() if n not in names}
+
+def listing_fingerprint(manifest: Dict[str, dict]) -> str:
+    """Hash of a build_manifest() result; changes when any blob is added, removed or rewritten."""
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()
+
+def entry_fingerprint(entry: dict) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_manifest(case_id: str) -> Optional[dict]:
+    try:
+        with open(_manifest_path(case_id), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    return data if isinstance(data, dict) and data.get("case_id") == case_id else None
+
+def save_manifest(case_id: str, blobs: Dict[str, dict], entry: dict) -> None:
+    atomic_write_json(_manifest_path(case_id), {
+        "case_id": case_id,
+        "updated_at": time.time(),
+        "entry_fingerprint": entry_fingerprint(entry),
+        "blobs": blobs,
+    })
+
+def diff_manifest(old: Dict[str, dict], new: Dict[str, dict]) -> Tuple[List[str], List[str], List[str]]:
+    """(added, changed, removed) blob names, in listing order where possible."""
+    added = [n for n in new if n not in old]
+    changed = [n for n in new if n in old and old[n] != new[n]]
+    removed = [n for n in old if n not in new]
+    return added, changed, removed
+
+def plan_update(case_id: str, current: Dict[str, dict], existing_entry: Optional[dict]) -> Tuple[str, List[str]]:
+    """
+    Decide how to run a case: ("skip", []), ("delta", names_to_process)
+    or ("full", all_names). A delta needs the master entry this manifest was
+    saved with, so a master that was rolled back or edited forces a full run.
+    """
+    previous = load_manifest(case_id)
+    if previous is None or not existing_entry:
+        return "full", list(current)
+    if previous.get("entry_fingerprint") != entry_fingerprint(existing_entry):
+        return "full", list(current)
+
+    added, changed, removed = diff_manifest(previous.get("blobs") or {}, current)
+    if removed:
+        return "full", list(current)  # can't un-learn evidence with a delta
+    if not added and not changed:
+        return "skip", []
+    return "delta", added + changed
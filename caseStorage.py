@@ -0,0 +1,203 @@
+# caseStorage.py
+# Where case documents live. A ticket's case_number picks the backend:
+#   case-001/                       GCS, default bucket (caseIngest.BUCKET)
+#   gs://other-bucket/case-001/     GCS, that bucket
+#   file:///nas/cases/case-001/     local disk / NAS mount (root /nas/cases)
+#   mem://bench/case-001/           in-memory buckets (offline runs, benchmarks)
+# A location is kept as the (bucket, prefix) pair the pipeline already
+# passes around; for local and in-memory storage the "bucket" is the URI of
+# the root ("file:///nas/cases", "mem://bench"), so cache keys and corpus
+# checks stay distinct per store.
+# Every backend's list_blobs(bucket, prefix) returns blobs with the
+# google.cloud.storage.Blob surface caseIngest uses (name, content_type,
+# size, generation, md5_hash, crc32c, download_as_bytes(start, end),
+# download_as_text()). Local and in-memory blobs also have open_stream():
+# the mmap'd file itself, or a BytesIO sharing the stored bytes, so a PDF is
+# parsed in place instead of being downloaded into a fresh buffer; local
+# blobs expose local_path for the PDF process pool.
+
+import io
+import os
+import re
+import mmap
+import hashlib
+import mimetypes
+import threading
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+class StorageBackend(ABC):
+    """list_blobs(bucket, prefix) -> blobs in name order, like storage.Client.list_blobs."""
+
+    @abstractmethod
+    def list_blobs(self, bucket: str, prefix: str = None):
+        ...
+
+# ------------------ GCS ------------------
+class GCSBackend(StorageBackend):
+    """google.cloud.storage, with the client created (and imported) on first use."""
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google.cloud import storage
+                self._client = storage.Client()
+            return self._client
+
+    def list_blobs(self, bucket: str, prefix: str = None):
+        return self.client.list_blobs(bucket, prefix=prefix)
+
+# ------------------ Local filesystem ------------------
+class LocalBlob:
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self.local_path = os.path.join(root, *name.split("/"))
+        st = os.stat(self.local_path)
+        self.size = st.st_size
+        self.content_type = mimetypes.guess_type(name)[0] or ""
+        self.generation = str(st.st_mtime_ns)
+        # Stat fingerprint in place of a content hash: hashing every file on
+        # each listing would read the whole case folder
+        self.md5_hash = f"stat:{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+        self.crc32c = None
+
+    def download_as_bytes(self, start: int = None, end: int = None) -> bytes:
+        with open(self.local_path, "rb") as f:
+            if start:
+                f.seek(start)
+            return f.read(-1 if end is None else end - (start or 0) + 1)
+
+    def download_as_text(self, start: int = None, end: int = None) -> str:
+        return self.download_as_bytes(start, end).decode("utf-8")
+
+    @contextmanager
+    def open_stream(self) -> Iterator[BinaryIO]:
+        with open(self.local_path, "rb") as f:
+            if self.size == 0:  # mmap can't map an empty file
+                yield io.BytesIO(b"")
+                return
+            # the mmap is itself a seekable file-like object; pypdf's many
+            # small reads go straight to it, no Python-level wrapper per read
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+class LocalBackend(StorageBackend):
+    """Files under a root directory; blob names are '/'-joined paths relative to it."""
+
+    def list_blobs(self, bucket: str, prefix: str = None):
+        root = local_root(bucket)
+        prefix = prefix or ""
+        # Only walk the directory the prefix can live in
+        base = os.path.join(root, *prefix.split("/")[:-1])
+        names: List[str] = []
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+            for fname in filenames:
+                name = fname if rel_dir == "." else f"{rel_dir}/{fname}"
+                if name.startswith(prefix):
+                    names.append(name)
+        return iter([LocalBlob(root, name) for name in sorted(names)])
+
+def local_root(bucket: str) -> str:
+    """Directory of a file:// bucket URI ("file:///C:/cases" -> "C:\\cases" on Windows)."""
+    parts = urlsplit(bucket)
+    if parts.netloc in ("", "localhost"):
+        return url2pathname(parts.path)
+    # file://server/share/cases names a network share (a UNC path on Windows)
+    return url2pathname(f"//{parts.netloc}{parts.path}")
+
+# ------------------ In memory ------------------
+class MemoryBlob:
+    def __init__(self, name: str, data: bytes, content_type: str = "", generation: int = 1):
+        self.name = name
+        self.content_type = content_type or mimetypes.guess_type(name)[0] or ""
+        self.size = len(data)
+        self.generation = str(generation)
+        self.md5_hash = hashlib.md5(data).hexdigest()
+        self.crc32c = None
+        self._data = bytes(data)
+
+    def download_as_bytes(self, start: int = None, end: int = None) -> bytes:
+        if start is None and end is None:
+            return self._data
+        return self._data[(start or 0):(None if end is None else end + 1)]
+
+    def download_as_text(self, start: int = None, end: int = None) -> str:
+        return self.download_as_bytes(start, end).decode("utf-8")
+
+    @contextmanager
+    def open_stream(self) -> Iterator[BinaryIO]:
+        # BytesIO over a bytes object shares its buffer until written to
+        with io.BytesIO(self._data) as stream:
+            yield stream
+
+class MemoryBackend(StorageBackend):
+    """Process-local buckets, e.g. MEMORY.put("mem://bench", "case-001/a.pdf", data)."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[str, MemoryBlob]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket: str, name: str, data: bytes, content_type: str = "") -> MemoryBlob:
+        with self._lock:
+            blobs = self._buckets.setdefault(bucket, {})
+            old = blobs.get(name)
+            blob = MemoryBlob(name, data, content_type, int(old.generation) + 1 if old else 1)
+            blobs[name] = blob
+            return blob
+
+    def delete(self, bucket: str, name: str) -> None:
+        with self._lock:
+            self._buckets.get(bucket, {}).pop(name, None)
+
+    def clear(self, bucket: Optional[str] = None) -> None:
+        with self._lock:
+            if bucket is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(bucket, None)
+
+    def list_blobs(self, bucket: str, prefix: str = None):
+        with self._lock:
+            blobs = list(self._buckets.get(bucket, {}).values())
+        return iter(sorted((b for b in blobs if b.name.startswith(prefix or "")), key=lambda b: b.name))
+
+MEMORY = MemoryBackend()
+_LOCAL = LocalBackend()
+
+# ------------------ Locations ------------------
+_SCHEME_RE = re.compile(r"([A-Za-z][A-Za-z0-9+.-]*)://")
+
+def case_location(case_number: str, default_bucket: str) -> Tuple[str, str]:
+    """(bucket, prefix) for a ticket's case_number (see the scheme table at the top)."""
+    case_number = (case_number or "").strip()
+    m = _SCHEME_RE.match(case_number)
+    if m is None:
+        return default_bucket, case_number
+    scheme, rest = m.group(1).lower(), case_number[m.end():]
+    if scheme == "gs":
+        bucket, _, prefix = rest.partition("/")
+        return bucket, prefix
+    if scheme in ("file", "mem"):
+        # The last path segment (with its trailing "/") is the case prefix
+        trailing = "/" if rest.endswith("/") else ""
+        head, _, case = rest.rstrip("/").rpartition("/")
+        return f"{scheme}://{head}", case + trailing
+    raise ValueError(f"Unsupported storage scheme '{scheme}://' in case_number '{case_number}'")
+
+def backend_for(bucket: str) -> Optional[StorageBackend]:
+    """Backend for a file:// or mem:// bucket; None for a GCS bucket name."""
+    if bucket.startswith("file://"):
+        return _LOCAL
+    if bucket.startswith("mem://"):
+        return MEMORY
+    return None
@@ -0,0 +1,162 @@
+# caseStore.py
+# Indexed store for master case entries (stdlib SQLite), replacing the
+# load-scan-rewrite of master.json on every upsert.
+# - one row per case id (primary-key index): upserts are O(log n)
+# - batch writes are a single transaction; writers take the lock up front
+#   (BEGIN IMMEDIATE), so concurrent runs don't lose each other's updates
+# - every write stamps the row with the next store-wide version, so readers
+#   can ask for changes since the last version they saw
+# - page() serves phase-filtered pages off an index on the entry's phase
+# - export_json() writes the familiar master.json array for the dashboard
+# - an empty store migrates itself from master.json (or the test.json seed);
+#   a source that won't parse raises instead of being recorded as migrated,
+#   and nothing is recorded until a source exists, so a master.json that
+#   appears later is still imported before the first export over it
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+from typing import Iterable, List, Optional, Tuple
+
+import donnaTrace
+from atomicFiles import atomic_write_json
+from sqliteStore import SqliteStore
+
+def _case_key(entry: dict) -> str:
+    key = str(entry.get("id") or "").strip()
+    # master.json tolerated id-less entries (each appended); keep them distinct
+    return key or f"~{uuid.uuid4().hex}"
+
+_PHASE_SQL = "json_extract(data, '$.litigation_phase')"
+
+class CaseStore(SqliteStore):
+    def __init__(self, path: str, migrate_from: Iterable[str] = ()):
+        super().__init__(path)
+        self.migrate_from = tuple(migrate_from)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cases ("
+                " id TEXT PRIMARY KEY,"
+                " position INTEGER NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cases_version ON cases(version)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cases_position ON cases(position)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS cases_phase ON cases({_PHASE_SQL}, position)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', '0')")
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> bool:
+        """Import the first existing legacy source once; True once a migration is recorded."""
+        if conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone() is not None:
+            return True
+        source, entries = self._read_legacy(self.migrate_from)
+        if not source:
+            return False  # nothing to import yet; try again on the next open or export
+        self._write(conn, entries)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (source,))
+        print(f"🌱 Migrated {len(entries)} case(s) from {source} into {self.path}")
+        return True
+
+    @staticmethod
+    def _read_legacy(paths: Iterable[str]) -> Tuple[str, List[dict]]:
+        """First existing JSON array among `paths` (master.json, then the seed); ("", []) if none exist."""
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                raise ValueError(f"Cannot migrate cases from {path}: {e}") from e
+            if not isinstance(data, list):
+                raise ValueError(f"Cannot migrate cases from {path}: expected a JSON array")
+            return path, [e for e in data if isinstance(e, dict)]
+        return "", []
+
+    def _write(self, conn: sqlite3.Connection, entries: List[dict]) -> int:
+        if not entries:
+            return int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+        version = int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]) + 1
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(version),))
+        now = time.time()
+        next_pos = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM cases").fetchone()[0]
+        for entry in entries:
+            key = _case_key(entry)
+            data = json.dumps(entry, ensure_ascii=False)
+            cur = conn.execute(
+                "UPDATE cases SET version = ?, updated_at = ?, data = ? WHERE id = ?",
+                (version, now, data, key),
+            )
+            if cur.rowcount == 0:
+                conn.execute(
+                    "INSERT INTO cases (id, position, version, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                    (key, next_pos, version, now, data),
+                )
+                next_pos += 1
+        return version
+
+    # ------------------ Writes ------------------
+    def upsert(self, entry: dict) -> int:
+        """Insert or replace one entry by id; returns the store version it was written at."""
+        return self.upsert_many([entry])
+
+    def upsert_many(self, entries: Iterable[dict]) -> int:
+        """All-or-nothing upsert of many entries (one version for the whole batch)."""
+        entries = [e for e in entries if isinstance(e, dict)]
+        with donnaTrace.span("store.upsert", entries=len(entries)):
+            with self._transaction() as conn:
+                return self._write(conn, entries)
+
+    # ------------------ Reads ------------------
+    def get(self, case_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM cases WHERE id = ?", ((case_id or "").strip(),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all(self) -> List[dict]:
+        """Every entry, in first-inserted order (the order master.json had)."""
+        return [json.loads(r[0]) for r in self._conn().execute("SELECT data FROM cases ORDER BY position")]
+
+    def page(self, phase: Optional[str] = None, offset: int = 0, limit: int = 50) -> Tuple[int, List[dict]]:
+        """(total matching, entries) for one page in store order, optionally of one litigation phase."""
+        where, args = ("", ()) if phase is None else (f"WHERE {_PHASE_SQL} = ?", (phase,))
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM cases {where}", args).fetchone()[0]
+        rows = conn.execute(f"SELECT data FROM cases {where} ORDER BY position LIMIT ? OFFSET ?",
+                            args + (limit, offset))
+        return total, [json.loads(r[0]) for r in rows]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def version(self) -> int:
+        return int(self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+    def changes_since(self, since: int, limit: Optional[int] = None) -> List[Tuple[int, dict]]:
+        """(version, entry) for entries written after version `since`, oldest first."""
+        sql = "SELECT version, data FROM cases WHERE version > ? ORDER BY version, position"
+        args: tuple = (since,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            args += (limit,)
+        return [(v, json.loads(d)) for v, d in self._conn().execute(sql, args)]
+
+    # ------------------ Export ------------------
+    def export_json(self, path: str) -> int:
+        """
+        Write all entries as a master.json-style array (atomically); returns the count.
+        A legacy source that appeared since the store was opened is imported
+        first, so the export never replaces cases the store hasn't seen.
+        """
+        with self._transaction() as conn:
+            if not self._migrate(conn):
+                # nothing existed to import; from here on the store is the source of truth
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (path,))
+        entries = self.all()
+        atomic_write_json(path, entries)
+        return len(entries)
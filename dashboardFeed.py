@@ -0,0 +1,121 @@
+# dashboardFeed.py
+# Static feed for the morgan-case-tracker board, exported from the case store
+# instead of copying the whole master.json into public/. The board draws a
+# column per phase from a few collapsed-card fields and needs the rest only
+# when a card is expanded, so the feed is split accordingly:
+#   feed/index.json                       phases -> count, card shards (tiny, never cached)
+#   feed/cards/<phase>-<n>.<hash>.json    up to CARDS_PER_SHARD compact cards
+#                                         (CARD_FIELDS) of one phase, in store order
+#   feed/cases/<case>.<hash>.json         one case's full entry, fetched on expand
+# The board loads the index and the first card shard of each column, and the
+# rest of a column only when asked to.
+# Shard names carry a hash of their content, so browsers can cache them
+# forever; unchanged shards are not rewritten on re-export, and shards no
+# longer referenced by the current or previous index are pruned.
+
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+from atomicFiles import atomic_write_bytes, atomic_write_json, safe_filename
+
+FEED_DIRNAME = "feed"
+FEED_VERSION = 1
+
+# What a collapsed CaseCard renders (status drives the border colour)
+CARD_FIELDS     = ["id", "client_name", "main_summary", "litigation_phase", "status", "venue"]
+CARDS_PER_SHARD = 200
+HASH_CHARS      = 12
+
+def _encode(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+def _shard_name(subdir: str, stem: str, body: bytes) -> str:
+    digest = hashlib.sha256(body).hexdigest()[:HASH_CHARS]
+    return f"{subdir}/{stem}.{digest}.json"
+
+def _write_shard(feed_dir: str, name: str, body: bytes) -> bool:
+    """Write a content-addressed shard unless it's already there; True if written."""
+    path = os.path.join(feed_dir, name)
+    if os.path.exists(path):
+        return False
+    atomic_write_bytes(path, body)
+    return True
+
+def card_view(entry: dict) -> dict:
+    """The CARD_FIELDS projection of an entry (feed cards and caseApi's view=card)."""
+    return {k: entry.get(k, {} if k == "venue" else "") for k in CARD_FIELDS}
+
+def build_shards(entries: Iterable[dict]) -> Tuple[dict, Dict[str, bytes]]:
+    """(index, {shard name: bytes}) for master entries, phases in first-seen order."""
+    shards: Dict[str, bytes] = {}
+    phases: Dict[str, List[dict]] = {}
+    for entry in entries:
+        body = _encode(entry)
+        name = _shard_name("cases", safe_filename(str(entry.get("id", ""))), body)
+        shards[name] = body
+        card = card_view(entry)
+        card["detail"] = name
+        phases.setdefault(str(entry.get("litigation_phase", "")).strip(), []).append(card)
+
+    index = {"version": FEED_VERSION, "generated_at": time.time(), "cases": 0, "phases": []}
+    for phase, cards in phases.items():
+        stem = safe_filename(phase or "unphased")
+        names = []
+        for n, start in enumerate(range(0, len(cards), CARDS_PER_SHARD)):
+            body = _encode(cards[start:start + CARDS_PER_SHARD])
+            names.append(_shard_name("cards", f"{stem}-{n}", body))
+            shards[names[-1]] = body
+        index["phases"].append({"phase": phase, "count": len(cards), "cards": names})
+        index["cases"] += len(cards)
+    return index, shards
+
+def _referenced(index: dict, feed_dir: str) -> set:
+    """Shard names an index points at (the card shards and every case detail in them)."""
+    names = set()
+    for p in index.get("phases", []):
+        for shard in p.get("cards", []):
+            names.add(shard)
+            try:
+                with open(os.path.join(feed_dir, shard), "r", encoding="utf-8") as f:
+                    names.update(c.get("detail") for c in json.load(f))
+            except Exception:
+                pass
+    return names
+
+def export_feed(entries: Iterable[dict], out_dir: str) -> dict:
+    """
+    Write the feed for `entries` under out_dir/feed and return the index.
+    The index is replaced last, so a reader always sees a complete feed.
+    """
+    feed_dir = os.path.join(out_dir, FEED_DIRNAME)
+    index_path = os.path.join(feed_dir, "index.json")
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except Exception:
+        previous = {}
+
+    index, shards = build_shards(entries)
+    written = sum(_write_shard(feed_dir, name, body) for name, body in shards.items())
+    atomic_write_json(index_path, index, indent=None)
+
+    # Keep the previous generation too: a board that loaded the old index
+    # may still fetch its shards
+    keep = set(shards) | _referenced(previous, feed_dir)
+    pruned = 0
+    for subdir in ("cards", "cases"):
+        d = os.path.join(feed_dir, subdir)
+        if not os.path.isdir(d):
+            continue
+        for fname in os.listdir(d):
+            if f"{subdir}/{fname}" not in keep:
+                os.remove(os.path.join(d, fname))
+                pruned += 1
+
+    first_load = sum(len(shards[p["cards"][0]]) for p in index["phases"])
+    print(f"🗂 Dashboard feed: {index['cases']} case(s) in {len(index['phases'])} phase(s), "
+          f"{first_load} bytes of cards on first load; {written} shard(s) written, {pruned} pruned")
+    return index
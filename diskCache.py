@@ -0,0 +1,139 @@
+# diskCache.py
+# Small persistent key/value cache on SQLite (stdlib only).
+# - values are JSON-serializable objects
+# - size-bounded: least-recently-used rows are evicted past max_bytes; the
+#   total size is kept in a meta row, so a put never re-sums the table
+# - reads stay read-only: a hit refreshes last_access only once it is more
+#   than TOUCH_INTERVAL_S old, so concurrent readers don't queue on the
+#   write lock (LRU order is that coarse)
+# - optional TTL: expired rows read as misses and are purged on write
+# - safe to share between threads (one connection per thread) and between
+#   processes (SQLite file locking, WAL journal)
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Optional
+
+from sqliteStore import SqliteStore
+
+TOUCH_INTERVAL_S = 300   # granularity of last_access (LRU order) on cache hits
+
+def make_key(*parts) -> str:
+    """Stable hex key from arbitrary parts (None and ints allowed)."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(("" if p is None else str(p)).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+class DiskCache(SqliteStore):
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl_s: Optional[float] = None):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " expires_at REAL)"
+            )
+            cols = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "expires_at" not in cols:  # cache files created before TTL support
+                conn.execute("ALTER TABLE entries ADD COLUMN expires_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_expiry ON entries(expires_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # cache files created before the running total: sum once
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) "
+                         "SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries")
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires_at, last_access FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count(False)
+            return None
+        try:
+            value = json.loads(row[0])
+        except Exception:
+            self.delete(key)
+            self._count(False)
+            return None
+        if now - row[2] > TOUCH_INTERVAL_S:
+            with self._transaction() as conn:
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return value
+
+    def put(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        """Store a value; ttl_s overrides the cache-wide TTL (None = cache default)."""
+        data = json.dumps(value)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        expires_at = now + ttl if ttl else None
+        with self._transaction() as conn:
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, expires_at),
+            )
+            self._add_size(conn, size - (old[0] if old else 0))
+            self._evict(conn)
+
+    def delete(self, key: str) -> None:
+        with self._transaction() as conn:
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._add_size(conn, -old[0])
+
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("UPDATE meta SET value = 0 WHERE key = 'total_size'")
+
+    def _add_size(self, conn: sqlite3.Connection, delta: int) -> int:
+        conn.execute("UPDATE meta SET value = value + ? WHERE key = 'total_size'", (delta,))
+        return conn.execute("SELECT value FROM meta WHERE key = 'total_size'").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        now = time.time()
+        expired = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires_at <= ?", (now,)).fetchone()[0]
+        if expired:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = self._add_size(conn, -expired)
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self._add_size(conn, -freed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,150 @@
+# donnaAsync.py
+# asyncio engine for Donna batches: many cases in flight at once, each stage
+# of the existing in-process pipeline gated by its own resource limit.
+#   GCS   -> Donna.prepare_case (list, manifest diff, download + extract);
+#            downloads and PDF parses are also capped across all cases
+#   LLM   -> Donna.synthesize_case (recordAgent + paralegal on Gemini);
+#            the Gemini calls themselves, map-reduce groups included, are
+#            also capped across all cases
+#   SMTP  -> Donna.notify_case only spools the email; a background drainer
+#            delivers it over a small pool of connections, retrying failures
+# The stage functions are blocking, so they run on a thread pool; PDF parsing
+# is pushed further out to caseIngest's process pool. Tickets flow through a
+# bounded queue to a fixed number of case workers, so memory stays bounded
+# no matter how long the ticket file is.
+#
+# Usage: python Donna.py --batch tickets.jsonl --async
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+import Donna
+import donnaTrace
+
+# ------------------ CONFIG ------------------
+MAX_CASES_IN_FLIGHT  = 16
+GCS_CONCURRENCY      = 8    # cases listing/downloading at once
+DOWNLOAD_CONCURRENCY = 16   # blob downloads in flight across all of them
+LLM_CONCURRENCY      = 4    # keep under the Gemini per-minute quota
+SMTP_CONCURRENCY     = 2
+
+class _Engine:
+    def __init__(self, gcs: int, llm: int, smtp: int):
+        import caseIngest
+
+        self.gcs = asyncio.Semaphore(gcs)
+        self.llm = asyncio.Semaphore(llm)
+        self.mail = Donna.start_mail_drainer(pool_size=smtp)
+        self.courts = caseIngest.load_courts_index(caseIngest.COURTS_PATH)
+        self.executor = ThreadPoolExecutor(max_workers=gcs + llm + 1)
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def close(self) -> list:
+        """Stop the mail drainer after its final pass; returns the email results."""
+        try:
+            return await self.run(Donna.stop_mail_drainer, self.mail)
+        finally:
+            self.executor.shutdown(wait=True)
+
+async def process_ticket(ticket: dict, engine: _Engine, existing: dict = None):
+    """
+    Donna.run_pipeline's stages for one ticket, each under its resource
+    limit. Returns the master entry, or None when the case is unchanged.
+    """
+    async with engine.gcs:
+        plan, product, corpus, manifest = await engine.run(Donna.prepare_case, ticket, existing)
+    if plan == "skip":
+        print(f"⏭ {product['id']}: no new or changed files since last run; skipped")
+        return None
+
+    async with engine.llm:
+        await engine.run(Donna.synthesize_case, product, corpus, engine.courts)
+
+    await engine.run(Donna.notify_case, product, engine.mail.spool)  # spool only; drained in the background
+    engine.mail.wake()
+    return await engine.run(Donna.finish_case, product, corpus, manifest)  # writes the manifest file
+
+async def run_tickets(tickets, existing=None, max_cases: int = MAX_CASES_IN_FLIGHT,
+                      gcs: int = GCS_CONCURRENCY, llm: int = LLM_CONCURRENCY, smtp: int = SMTP_CONCURRENCY,
+                      downloads: int = DOWNLOAD_CONCURRENCY):
+    """
+    Process an iterable of (line_no, ticket_or_None, error) as produced by
+    Donna._read_tickets; `existing` maps case id -> current master entry
+    (a dict or the CaseStore, anything with .get).
+    Returns (results, entries, emails): per-ticket result rows in input
+    order, the master entries of cases that changed and the per-message
+    results of delivering spooled emails.
+    """
+    import caseIngest
+
+    # CPU-bound pypdf goes to the process pool; the download and Gemini caps
+    # are process-wide, so a case's parallel map calls count against `llm` too
+    with caseIngest.shared_limits(downloads, parse_mode="process", llm=llm):
+        return await _run_tickets(tickets, existing, max_cases, gcs, llm, smtp)
+
+async def _run_tickets(tickets, existing, max_cases: int, gcs: int, llm: int, smtp: int):
+    engine = _Engine(gcs, llm, smtp)
+    existing = existing or {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_cases * 2)  # backpressure on the reader
+    results: Dict[int, dict] = {}
+    entries: Dict[int, dict] = {}
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            line_no, ticket, error = item
+            case_id = (ticket or {}).get("case_number", "")
+            t0 = time.time()
+            if ticket is not None:
+                try:
+                    entry = await process_ticket(ticket, engine, existing.get(case_id.strip()))
+                    if entry is not None:
+                        entries[line_no] = entry
+                    print(f"✅ [{line_no}] {case_id}")
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            if error:
+                print(f"❌ [{line_no}] {case_id or '<no case>'}: {error}")
+            results[line_no] = {
+                "line": line_no,
+                "case_number": case_id,
+                "ok": error is None,
+                "error": error,
+                "seconds": round(time.time() - t0, 3),
+            }
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_cases)]
+    try:
+        for item in tickets:
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        emails = await engine.close()
+
+    order = sorted(results)
+    return [results[n] for n in order], [entries[n] for n in order if n in entries], emails
+
+def run_batch_async(tickets_path: str = Donna.TICKETS_PATH, **limits) -> dict:
+    """Async counterpart of Donna.run_batch: same store write, export and report."""
+    print(f"\n🚀 DONNA ASYNC BATCH STARTED ({tickets_path})")
+    started = time.time()
+    store = Donna.open_case_store()
+    results, entries, emails = asyncio.run(run_tickets(Donna._read_tickets(tickets_path), store, **limits))
+
+    store.upsert_many(entries)  # one transaction for the whole batch
+    Donna.publish_master()
+    donnaTrace.flush()
+
+    report = Donna._batch_report(results, started, emails)
+    Donna.save_json(Donna.BATCH_REPORT_PATH, report)
+    print(f"🎯 DONNA ASYNC BATCH COMPLETE: {report['succeeded']}/{report['tickets']} ok, "
+          f"{report['failed']} failed in {report['seconds']}s (details in {Donna.BATCH_REPORT_PATH})\n")
+    return report
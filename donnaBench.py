@@ -0,0 +1,452 @@
+# donnaBench.py
+# Offline benchmark suite for the Donna pipeline. Generates synthetic case
+# folders (PDFs with page headers/footers and Bates stamps, a re-scanned
+# copy, TXT/JSON/CSV notes and media files the pipeline must skip), serves
+# them from a fake storage client with the list_blobs/download_as_bytes
+# surface caseIngest uses, and answers Gemini calls from a deterministic stub
+# with injectable latency (or, with --storage local/memory, writes them to a
+# file:// or mem:// case store; see caseStorage.py). Nothing touches the knighthacks-mm bucket, the
+# Gemini API or an SMTP server, and every run works in a throwaway directory.
+#
+# For each benchmark it reports throughput, p50/p95 latency per operation
+# and the process's peak RSS after the benchmark:
+#   gather_case_text            one case per op (list + download + extract + pack)
+#   resolve_politics_and_court  one county per op, against the compiled CourtsIndex
+#   copy_product_to_master      one product upserted into the case store per op
+#   run_donna                   one ticket end to end (in-process mode) per op
+#
+# Usage: python donnaBench.py [--cases 20] [--pdfs 4] [--pages 8] [--storage fake|local|memory]
+#                             [--llm-latency 0.05] [--storage-latency 0.005]
+#                             [--only gather_case_text,run_donna] [--json bench.json]
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import pathlib
+import argparse
+import tempfile
+from contextlib import contextmanager, redirect_stdout
+from typing import Callable, Iterable, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import caseIngest
+import caseStorage
+import Donna
+import MessageSender
+
+# ------------------ CONFIG ------------------
+BENCH_CASES        = 20
+PDFS_PER_CASE      = 4
+PAGES_PER_PDF      = 8
+LINES_PER_PAGE     = 40
+STORAGE_LATENCY_S  = 0.005   # per download / listing call
+LLM_LATENCY_S      = 0.05    # per generate_content call
+RESOLVE_LOOKUPS    = 20_000
+MASTER_UPSERTS     = 500
+SEED               = 7
+BENCH_BUCKET       = "bench-bucket"
+BENCH_STORAGE      = "fake"    # fake (latency-injecting GCS stand-in), local (file://, mmap) or memory (mem://)
+
+BENCHMARKS = ("gather_case_text", "resolve_politics_and_court", "copy_product_to_master", "run_donna")
+
+# ------------------ Synthetic PDFs ------------------
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal valid PDF (Helvetica text, one content stream per page) that pypdf can parse."""
+    objects: List[bytes] = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    pages_obj = 2 + 2 * len(pages)  # font, then (content, page) per page, then the page tree
+    page_ids = []
+    for lines in pages:
+        ops = ["BT /F1 9 Tf 40 760 Td 11 TL"] + [f"({_pdf_escape(line)}) Tj T*" for line in lines] + ["ET"]
+        content = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R"
+                       b" /Resources << /Font << /F1 1 0 R >> >> >>" % (pages_obj, len(objects)))
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return bytes(out)
+
+# ------------------ Synthetic case folders ------------------
+_VOCAB = (
+    "patient plaintiff defendant treatment diagnosis lumbar cervical strain fracture MRI "
+    "physical therapy orthopedic surgeon emergency department discharge prescribed follow-up "
+    "deposition discovery interrogatories request production mediation settlement demand "
+    "liability negligence collision intersection insurer adjuster policy limits damages "
+    "wage loss billing invoice records custodian affidavit subpoena hearing motion trial "
+    "pain radiating numbness injection chiropractic evaluation impairment rating prognosis"
+).split()
+_COUNTIES = ("Orange", "Hillsborough", "Duval", "Miami-Dade", "Broward", "Polk", "Leon", "Seminole")
+_SKIPPED = (("photo_scene.jpg", "image/jpeg"), ("voicemail.m4a", "audio/mp4"), ("dashcam.mp4", "video/mp4"))
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_VOCAB) for _ in range(words)).capitalize() + "."
+
+def _record_pages(rng: random.Random, case_id: str, doc: int, pages: int) -> List[List[str]]:
+    out = []
+    for p in range(1, pages + 1):
+        body = [_sentence(rng, rng.randint(8, 14)) for _ in range(LINES_PER_PAGE)]
+        out.append(
+            [f"Orlando Health - Medical Records - {case_id}", f"Received by fax 03/14/2025 10:{p % 60:02d} p. {p}"]
+            + body
+            + [f"MM{doc:02d}{p:06d}", f"Page {p} of {pages}"]
+        )
+    return out
+
+def make_case_files(case_id: str, rng: random.Random, pdfs: int = PDFS_PER_CASE,
+                    pages: int = PAGES_PER_PDF) -> List[Tuple[str, bytes, str]]:
+    """[(blob name, data, content_type)] for one synthetic case folder."""
+    files = []
+    for doc in range(pdfs):
+        files.append((f"{case_id}/records_{doc}.pdf", make_pdf(_record_pages(rng, case_id, doc, pages)),
+                      "application/pdf"))
+    if files:
+        # A re-scan of the first record set, for the near-duplicate path
+        files.append((f"{case_id}/records_0_rescan.pdf", files[0][1], "application/pdf"))
+    county = rng.choice(_COUNTIES)
+    notes = "\n".join(_sentence(rng, 12) for _ in range(30))
+    files.append((f"{case_id}/intake_notes.txt", notes.encode("utf-8"), "text/plain"))
+    intake = {"client": case_id, "county": county, "incident": _sentence(rng, 10),
+              "providers": [_sentence(rng, 3) for _ in range(5)]}
+    files.append((f"{case_id}/intake.json", json.dumps(intake).encode("utf-8"), "application/json"))
+    rows = ["date,provider,cpt,amount"] + [
+        f"2025-0{rng.randint(1, 9)}-1{rng.randint(0, 9)},{rng.choice(_VOCAB)},{rng.randint(97000, 99999)},"
+        f"{rng.randint(50, 5000)}.00" for _ in range(60)
+    ]
+    files.append((f"{case_id}/billing.csv", "\n".join(rows).encode("utf-8"), "text/csv"))
+    for name, ctype in _SKIPPED:
+        files.append((f"{case_id}/{name}", rng.randbytes(4096), ctype))
+    return files
+
+# ------------------ Fake storage ------------------
+class FakeBlob:
+    """The slice of google.cloud.storage.Blob that caseIngest and caseManifest use."""
+    def __init__(self, name: str, data: bytes, content_type: str = "", latency_s: float = 0.0):
+        self.name = name
+        self.content_type = content_type
+        self.size = len(data)
+        self.generation = 1
+        self.md5_hash = hashlib.md5(data).hexdigest()
+        self.crc32c = None
+        self._data = data
+        self._latency_s = latency_s
+
+    def download_as_bytes(self, start: int = None, end: int = None) -> bytes:
+        if self._latency_s:
+            time.sleep(self._latency_s)
+        if start is None and end is None:
+            return self._data
+        return self._data[(start or 0):(None if end is None else end + 1)]
+
+    def download_as_text(self, start: int = None, end: int = None) -> str:
+        return self.download_as_bytes(start, end).decode("utf-8")
+
+class FakeStorageClient:
+    def __init__(self, blobs: Iterable[FakeBlob], latency_s: float = 0.0):
+        self.blobs = sorted(blobs, key=lambda b: b.name)  # GCS lists in name order
+        self.latency_s = latency_s
+
+    def list_blobs(self, bucket: str, prefix: str = None):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return iter([b for b in self.blobs if b.name.startswith(prefix or "")])
+
+# ------------------ Gemini stub ------------------
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class StubModel:
+    """
+    Stands in for genai.GenerativeModel: the same prompt always gets the
+    same JSON answer (a superset of what the agents and map calls read),
+    after `latency_s` of simulated model time.
+    """
+    def __init__(self, latency_s: float = LLM_LATENCY_S):
+        self.latency_s = latency_s
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        phase = rng.choice(("Discovery", "Settlement Discussion", "Pre-Trial", "Trial"))
+        answer = {
+            "main_summary": _sentence(rng, 16),
+            "key_findings": [_sentence(rng, 8) for _ in range(3)],
+            "hipaa_necessity": _sentence(rng, 10),
+            "medical_history_summary": _sentence(rng, 20),
+            "political_reading": "",
+            "litigation_phase": phase,
+            "status": "Pending",
+            "venue": {"court_type": "", "county": rng.choice(_COUNTIES)},
+            "relevant_cases": [{"case_name": f"{rng.choice(_VOCAB).title()} v. State", "citation": "123 So. 3d 456",
+                                "court": "Fla. 5th DCA", "summary": _sentence(rng, 10), "relevance_score": 0.8}],
+            "federal_cases": [],
+            "notes": "",
+            "checklist": {"Discovery": {"Scheduled Plaintiff Deposition": rng.random() < 0.5}},
+            "facts": [_sentence(rng, 8) for _ in range(4)],
+            "medical": _sentence(rng, 12),
+            "hipaa": "",
+            "litigation_signals": [_sentence(rng, 6)],
+            "county": "",
+            "checklist_evidence": {},
+        }
+        return StubResponse(json.dumps(answer))
+
+class StubSMTP:
+    """smtplib.SMTP(_SSL) stand-in: accepts every message."""
+    sent = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def login(self, *args):
+        pass
+
+    def send_message(self, message, *args, **kwargs) -> dict:
+        StubSMTP.sent += 1
+        return {}
+
+    def noop(self):
+        return 250, b"OK"
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+# ------------------ Measurement ------------------
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB elsewhere
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+def measure(name: str, fn: Callable, items: Iterable, **extra) -> dict:
+    """Time fn(item) for every item; one latency sample per call."""
+    latencies = []
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "benchmark": name,
+        "ops": len(latencies),
+        "seconds": round(seconds, 4),
+        "throughput_per_s": round(len(latencies) / seconds, 2) if seconds else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+@contextmanager
+def _patched(obj, **attrs):
+    saved = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+
+@contextmanager
+def bench_environment(cases: int = BENCH_CASES, pdfs: int = PDFS_PER_CASE, pages: int = PAGES_PER_PDF,
+                      storage_latency_s: float = STORAGE_LATENCY_S, llm_latency_s: float = LLM_LATENCY_S,
+                      seed: int = SEED, storage: str = BENCH_STORAGE):
+    """
+    Throwaway working directory (with Courts.json/Template.json) in which
+    the synthetic cases are served by `storage`, Gemini is the stub, SMTP is
+    stubbed and the on-disk caches are off. Yields (case numbers, model).
+    """
+    rng = random.Random(seed)
+    names = [f"bench-case-{n:04d}" for n in range(cases)]
+    files = [f for name in names for f in make_case_files(name, rng, pdfs, pages)]
+    model = StubModel(llm_latency_s)
+    here = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="donna-bench-")
+    for name in (caseIngest.COURTS_PATH, Donna.TEMPLATE_PATH):
+        shutil.copy(os.path.join(here, name), os.path.join(workdir, name))
+    saved_clients = dict(caseIngest._CLIENTS)
+    if storage == "fake":
+        caseIngest._CLIENTS["storage"] = FakeStorageClient(
+            [FakeBlob(name, data, ctype, storage_latency_s) for name, data, ctype in files], storage_latency_s)
+        root = ""
+    elif storage == "local":
+        root = pathlib.Path(workdir, "cases").as_uri() + "/"
+        for name, data, _ in files:
+            path = os.path.join(workdir, "cases", *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+    elif storage == "memory":
+        root = f"mem://{os.path.basename(workdir)}/"
+        for name, data, ctype in files:
+            caseStorage.MEMORY.put(root.rstrip("/"), name, data, ctype)
+    else:
+        raise ValueError(f"unknown storage '{storage}' (choose fake, local or memory)")
+    case_numbers = [f"{root}{name}/" for name in names]
+    os.chdir(workdir)
+    try:
+        with _patched(caseIngest, BUCKET=BENCH_BUCKET, EXTRACT_CACHE_PATH="", LLM_CACHE_PATH=""), \
+             _patched(MessageSender.smtplib, SMTP=StubSMTP, SMTP_SSL=StubSMTP), \
+             _patched(Donna, _STORE=None):
+            caseIngest._CLIENTS["model"] = model
+            try:
+                yield case_numbers, model
+            finally:
+                if Donna._STORE is not None:
+                    Donna._STORE.close()
+    finally:
+        caseIngest._CLIENTS.clear()
+        caseIngest._CLIENTS.update(saved_clients)
+        if storage == "memory":
+            caseStorage.MEMORY.clear(root.rstrip("/"))
+        os.chdir(here)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# ------------------ Benchmarks ------------------
+def bench_gather_case_text(case_numbers: List[str]) -> dict:
+    sizes = {"files": 0, "chars": 0}
+
+    def one(case_number):
+        result = caseIngest.gather_case_text(*caseIngest.case_location(case_number))
+        sizes["files"] += result["files_processed"]
+        sizes["chars"] += len(result["joined_text"])
+
+    row = measure("gather_case_text", one, case_numbers)
+    row.update(files_per_case=round(sizes["files"] / max(1, len(case_numbers)), 1),
+               packed_chars_per_case=sizes["chars"] // max(1, len(case_numbers)))
+    return row
+
+def bench_resolve_politics_and_court(lookups: int = RESOLVE_LOOKUPS, seed: int = SEED) -> dict:
+    courts = caseIngest.load_courts_index(caseIngest.COURTS_PATH)
+    rng = random.Random(seed)
+    counties = [rng.choice(_COUNTIES + ("Unknown", "orange county", " Miami Dade ")) for _ in range(lookups)]
+    return measure("resolve_politics_and_court",
+                   lambda county: caseIngest._resolve_politics_and_court(county, courts), counties)
+
+def bench_copy_product_to_master(upserts: int = MASTER_UPSERTS, seed: int = SEED) -> dict:
+    template = Donna.load_json(Donna.TEMPLATE_PATH)
+    rng = random.Random(seed)
+    products = []
+    for n in range(upserts):
+        product = json.loads(json.dumps(template))
+        product.update(id=f"bench-master-{n % (upserts // 2 or 1):05d}",  # half are updates
+                       client_name=f"Client {n}", main_summary=_sentence(rng, 20),
+                       key_findings=[_sentence(rng, 8) for _ in range(3)], litigation_phase="Discovery")
+        products.append(product)
+    with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+        row = measure("copy_product_to_master", Donna.copy_product_to_master, products)
+    row["store_cases"] = Donna.open_case_store().count()
+    return row
+
+def bench_run_donna(case_numbers: List[str], model: StubModel) -> dict:
+    tickets = []
+    for n, case_number in enumerate(case_numbers):
+        path = f"ticket_{n}.json"
+        Donna.save_json(path, {"case_number": case_number, "client_name": f"Client {n}",
+                               "client_email": f"client{n}@example.com"})
+        tickets.append(path)
+    calls, chars = model.calls, model.prompt_chars
+    with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+        row = measure("run_donna", lambda path: Donna.run_donna("inprocess", path), tickets)
+    ops = max(1, len(tickets))
+    row.update(llm_calls_per_case=round((model.calls - calls) / ops, 1),
+               prompt_chars_per_case=(model.prompt_chars - chars) // ops)
+    return row
+
+def run_suite(only: Iterable[str] = BENCHMARKS, **env) -> List[dict]:
+    """Run the selected benchmarks in one synthetic environment; returns one row per benchmark."""
+    rows = []
+    with bench_environment(**env) as (case_numbers, model):
+        for name in only:
+            if name == "gather_case_text":
+                rows.append(bench_gather_case_text(case_numbers))
+            elif name == "resolve_politics_and_court":
+                rows.append(bench_resolve_politics_and_court())
+            elif name == "copy_product_to_master":
+                rows.append(bench_copy_product_to_master())
+            elif name == "run_donna":
+                rows.append(bench_run_donna(case_numbers, model))
+            else:
+                raise ValueError(f"unknown benchmark '{name}' (choose from {', '.join(BENCHMARKS)})")
+    return rows
+
+def print_report(rows: List[dict]) -> None:
+    print(f"\n{'benchmark':<28} {'ops':>7} {'ops/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'peak RSS MB':>12}")
+    for r in rows:
+        print(f"{r['benchmark']:<28} {r['ops']:>7} {r['throughput_per_s'] or 0:>10.1f} "
+              f"{r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['peak_rss_mb'] or 0:>12.1f}")
+        extra = {k: v for k, v in r.items()
+                 if k not in ("benchmark", "ops", "seconds", "throughput_per_s", "p50_ms", "p95_ms", "peak_rss_mb")}
+        if extra:
+            print("    " + ", ".join(f"{k}={v}" for k, v in extra.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Donna pipeline on synthetic cases, offline.")
+    parser.add_argument("--cases", type=int, default=BENCH_CASES, help="synthetic case folders")
+    parser.add_argument("--pdfs", type=int, default=PDFS_PER_CASE, help="PDFs per case (plus one re-scan)")
+    parser.add_argument("--pages", type=int, default=PAGES_PER_PDF, help="pages per PDF")
+    parser.add_argument("--storage", choices=("fake", "local", "memory"), default=BENCH_STORAGE,
+                        help="serve the cases from the fake GCS client, a file:// folder or mem:// buckets")
+    parser.add_argument("--storage-latency", type=float, default=STORAGE_LATENCY_S, metavar="S",
+                        help="simulated seconds per storage call")
+    parser.add_argument("--llm-latency", type=float, default=LLM_LATENCY_S, metavar="S",
+                        help="simulated seconds per Gemini call")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated benchmarks to run")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    only = [name.strip() for name in args.only.split(",") if name.strip()]
+    print(f"⏱ Benchmarking {', '.join(only)} on {args.cases} synthetic case(s) "
+          f"({args.pdfs} PDFs x {args.pages} pages each, {args.storage} storage)")
+    rows = run_suite(only, cases=args.cases, pdfs=args.pdfs, pages=args.pages,
+                     storage_latency_s=args.storage_latency, llm_latency_s=args.llm_latency, seed=args.seed,
+                     storage=args.storage)
+    print_report(rows)
+    if args.json:
+        Donna.save_json(args.json, {"config": vars(args), "results": rows})
+        print(f"\n📄 Wrote {args.json}")
+
+if __name__ == "__main__":
+    main()
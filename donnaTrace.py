@@ -0,0 +1,191 @@
+# donnaTrace.py
+# Opt-in tracing for the Donna pipeline: span timers around each stage and
+# counters for the work done in them, so a slow run can be pinned on
+# listing, download, PDF parsing, the Gemini call, JSON repair, the store
+# upsert or SMTP instead of guessed from the emoji status lines.
+# - with span("pdf.parse", file=name): ...   times a block (errors are recorded)
+# - count("bytes_downloaded", n)             adds to a process-wide counter
+# - every finished span is appended to a JSON-lines file; flush() writes
+#   per-span totals and the counters in Prometheus textfile-collector format
+# - off unless enable() is called (Donna.py --trace/--metrics) or the
+#   DONNA_TRACE / DONNA_METRICS env vars name the outputs; while off, span()
+#   hands back one shared no-op object and count() returns at once
+#
+# Span names used by the pipeline:
+#   stage.prepare / stage.synthesize / stage.notify / stage.finish   (per case)
+#   storage.list  storage.download  pdf.parse  gather  gemini.generate
+#   llm.parse_json  store.upsert  smtp.send
+
+import os
+import re
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from typing import Dict, Optional
+
+from atomicFiles import atomic_write_text
+
+TRACE_ENV     = "DONNA_TRACE"     # JSON-lines span log (appended to; safe across processes)
+METRICS_ENV   = "DONNA_METRICS"   # Prometheus textfile, e.g. /var/lib/node_exporter/textfile/donna.prom
+METRIC_PREFIX = "donna"
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "start", "t0")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.time()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._finish(self, time.perf_counter() - self.t0, exc_type)
+        return False
+
+    def set(self, **attrs) -> None:
+        """Attach attributes learned inside the span (sizes, cache hit, ...)."""
+        self.attrs.update(attrs)
+
+class Tracer:
+    def __init__(self, jsonl_path: Optional[str] = None, prom_path: Optional[str] = None):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.spans: Dict[str, list] = {}      # name -> [count, seconds, errors, max seconds]
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._fd = None
+        if jsonl_path:
+            d = os.path.dirname(jsonl_path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            # O_APPEND: whole-line writes from several workers/processes don't interleave
+            self._fd = os.open(jsonl_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _finish(self, span: _Span, seconds: float, exc_type) -> None:
+        record = {"ts": round(span.start, 6), "span": span.name, "ms": round(seconds * 1000, 3),
+                  "pid": os.getpid(), "thread": threading.current_thread().name}
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(span.attrs)
+        with self._lock:
+            agg = self.spans.setdefault(span.name, [0, 0.0, 0, 0.0])
+            agg[0] += 1
+            agg[1] += seconds
+            agg[2] += exc_type is not None
+            agg[3] = max(agg[3], seconds)
+        if self._fd is not None:
+            os.write(self._fd, (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "spans": {name: {"count": c, "seconds": round(s, 6), "errors": e, "max_seconds": round(m, 6)}
+                          for name, (c, s, e, m) in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def prometheus_text(self) -> str:
+        snap = self.snapshot()
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_span_seconds Wall time spent in Donna pipeline spans.",
+            f"# TYPE {p}_span_seconds summary",
+        ]
+        for name, s in sorted(snap["spans"].items()):
+            label = _label(name)
+            lines.append(f'{p}_span_seconds_sum{{span="{label}"}} {s["seconds"]}')
+            lines.append(f'{p}_span_seconds_count{{span="{label}"}} {s["count"]}')
+        lines += [f"# HELP {p}_span_errors_total Spans that ended with an exception.",
+                  f"# TYPE {p}_span_errors_total counter"]
+        lines += [f'{p}_span_errors_total{{span="{_label(name)}"}} {s["errors"]}' for name, s in sorted(snap["spans"].items())]
+        lines += [f"# HELP {p}_span_max_seconds Longest single span.",
+                  f"# TYPE {p}_span_max_seconds gauge"]
+        lines += [f'{p}_span_max_seconds{{span="{_label(name)}"}} {s["max_seconds"]}' for name, s in sorted(snap["spans"].items())]
+        for name, value in sorted(snap["counters"].items()):
+            metric = f"{p}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Write the Prometheus textfile (atomically, so the collector never reads half a file)."""
+        if self.prom_path and os.getpid() == self._pid:  # not from a forked pool worker
+            atomic_write_text(self.prom_path, self.prometheus_text())
+
+    def close(self) -> None:
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+# ------------------ Module-level switch ------------------
+_TRACER: Optional[Tracer] = None
+
+def enable(jsonl_path: Optional[str] = None, prom_path: Optional[str] = None) -> Tracer:
+    """Start tracing to the given outputs (either may be None); replaces an active tracer."""
+    global _TRACER
+    disable()
+    _TRACER = Tracer(jsonl_path, prom_path)
+    return _TRACER
+
+def disable() -> None:
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    if tracer is not None:
+        tracer.close()
+
+def enabled() -> bool:
+    return _TRACER is not None
+
+def span(name: str, **attrs):
+    """Context manager timing a block; a shared no-op while tracing is off."""
+    if _TRACER is None:
+        return _NOOP
+    return _Span(_TRACER, name, attrs)
+
+def count(name: str, n: float = 1) -> None:
+    if _TRACER is not None:
+        _TRACER.count(name, n)
+
+def flush() -> None:
+    if _TRACER is not None:
+        _TRACER.flush()
+
+def snapshot() -> dict:
+    return _TRACER.snapshot() if _TRACER is not None else {"spans": {}, "counters": {}}
+
+# A PDF-pool worker inherits the env but must not replace the parent's textfile
+_METRICS_FROM_ENV = None if multiprocessing.parent_process() else os.environ.get(METRICS_ENV)
+if os.environ.get(TRACE_ENV) or _METRICS_FROM_ENV:
+    enable(os.environ.get(TRACE_ENV) or None, _METRICS_FROM_ENV or None)
+atexit.register(disable)
@@ -0,0 +1,214 @@
+# evidenceRank.py
+# Relevance-ranked evidence packing for the prompt budget.
+# Extracted files are cut into line-aligned chunks, indexed in a small local
+# inverted index, and scored with BM25 against what the prompt actually asks
+# about: the checklist items from Template.json plus litigation phase / venue
+# vocabulary. The best chunks are packed into the character budget and
+# re-emitted in original file and line order, so a deposition notice deep in
+# the listing beats boilerplate from whatever file sorts first.
+
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+TEMPLATE_PATH = "Template.json"   # checklist items become ranking queries
+
+CHUNK_CHARS     = 500     # target chunk size (chunks end on line boundaries)
+CHUNK_MAX_CHARS = 1_000   # longer single lines are hard-split
+GAP_MARKER      = "[…]"   # stands in for skipped chunks inside a file
+
+BM25_K1 = 1.5
+BM25_B  = 0.75
+
+# Terms the prompt cares about beyond the checklist wording
+PHASE_VENUE_TERMS = {
+    "discovery": 1.0, "interrogatories": 1.5, "interrogatory": 1.5, "request": 0.5,
+    "production": 1.0, "admissions": 1.0, "subpoena": 1.5,
+    "deposition": 2.0, "deposed": 2.0, "transcript": 1.5, "notice": 1.0,
+    "mediation": 2.0, "mediator": 2.0, "settlement": 2.0, "offer": 1.0, "demand": 1.0,
+    "pretrial": 2.0, "trial": 1.5, "jury": 1.5, "verdict": 1.5, "motion": 1.0,
+    "order": 1.0, "hearing": 1.0, "expert": 1.5, "witness": 1.0,
+    "county": 1.5, "circuit": 1.5, "court": 1.0, "venue": 2.0, "judge": 1.0,
+    "filed": 1.0, "complaint": 1.0, "plaintiff": 0.5, "defendant": 0.5,
+    "injury": 1.0, "diagnosis": 1.0, "treatment": 1.0, "surgery": 1.0,
+    "medical": 1.0, "records": 1.0, "hipaa": 2.0, "authorization": 1.0,
+    "liability": 1.0, "damages": 1.0, "payment": 1.5, "paid": 1.0, "check": 0.5,
+}
+
+_STOPWORDS = {
+    "the", "and", "for", "that", "this", "with", "from", "have", "has", "been",
+    "are", "was", "were", "will", "would", "shall", "not", "but", "you", "your",
+    "our", "their", "they", "any", "all", "its", "into", "upon", "such", "also",
+    "did", "does", "need", "bring", "we", "do", "of", "to", "in", "on", "or",
+    "a", "an", "is", "it", "be", "by", "as", "at", "if", "so",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _stem(t: str) -> str:
+    # Just enough folding for "depositions"/"deposition", "scheduled"/"schedule"
+    for suf in ("ing", "ed", "es", "s"):
+        if len(t) > len(suf) + 3 and t.endswith(suf):
+            return t[: -len(suf)]
+    return t
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+# ------------------ Query ------------------
+_QUERY_CACHE: Dict[str, Dict[str, float]] = {}
+
+def _checklist_items(path: str) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checklist = json.load(f).get("checklist", {})
+    except Exception:
+        return []
+    items = []
+    for section, tasks in checklist.items():
+        items.append(section)
+        if isinstance(tasks, dict):
+            items.extend(tasks.keys())
+    return items
+
+def query_weights(template_path: str = TEMPLATE_PATH) -> Dict[str, float]:
+    """Stemmed term -> query weight (checklist wording + phase/venue vocabulary)."""
+    if template_path not in _QUERY_CACHE:
+        weights: Dict[str, float] = defaultdict(float)
+        for item in _checklist_items(template_path):
+            for t in tokenize(item):
+                weights[t] += 1.0
+        for term, w in PHASE_VENUE_TERMS.items():
+            weights[_stem(term)] += w
+        _QUERY_CACHE[template_path] = dict(weights)
+    return _QUERY_CACHE[template_path]
+
+# ------------------ Chunking ------------------
+def chunk_text(text: str) -> List[str]:
+    """
+    Line-aligned chunks of ~CHUNK_CHARS. "\\n".join(chunks) reproduces the
+    text except for hard-split long lines and trailing blank lines.
+    """
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+    for line in text.split("\n"):
+        while len(line) > CHUNK_MAX_CHARS:
+            if buf:
+                chunks.append("\n".join(buf))
+                buf, size = [], 0
+            chunks.append(line[:CHUNK_MAX_CHARS])
+            line = line[CHUNK_MAX_CHARS:]
+        buf.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_CHARS:
+            chunks.append("\n".join(buf))
+            buf, size = [], 0
+    if buf and any(buf):
+        chunks.append("\n".join(buf))
+    return chunks
+
+# ------------------ BM25 ------------------
+class Bm25Index:
+    def __init__(self, docs: List[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.n = len(docs)
+        self.lengths = [len(d) for d in docs]
+        self.avgdl = (sum(self.lengths) / self.n) if self.n else 0.0
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for i, d in enumerate(docs):
+            for term, tf in Counter(d).items():
+                self.postings[term].append((i, tf))
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: Dict[str, float]) -> List[float]:
+        out = [0.0] * self.n
+        if not self.n or not self.avgdl:
+            return out
+        for term, weight in query.items():
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf(term)
+            for i, tf in plist:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avgdl)
+                out[i] += weight * idf * tf * (self.k1 + 1) / norm
+        return out
+
+# ------------------ Packing ------------------
+def pack_ranked(documents: List[Tuple[str, str]], budget: int) -> Tuple[str, dict]:
+    r"""
+    Pack the highest-scoring chunks of `documents` ([(name, text)], listing
+    order) into `budget` characters, counted like gather_case_text counts
+    ("[FILE name]\n" header + text per file). Gap markers are charged up
+    front, so the result never exceeds the budget. Returns (joined_text, stats).
+    Checks (python -m doctest evidenceRank.py):
+
+    >>> cover = "\n".join(f"Lorem ipsum boilerplate line {i} about nothing in particular." for i in range(60))
+    >>> notice = "NOTICE OF DEPOSITION\nPlaintiff deposition is scheduled; mediation order attached."
+    >>> docs = [("a_cover.txt", cover), ("z_notice.txt", notice)]
+    >>> pack_ranked(docs, 120)  # only room for one chunk: the relevant one wins
+    ('[FILE z_notice.txt]\nNOTICE OF DEPOSITION\nPlaintiff deposition is scheduled; mediation order attached.', {'chunks_total': 8, 'chunks_packed': 1, 'files_packed': 1, 'chars_packed': 110})
+    >>> text, stats = pack_ranked(docs, 800)
+    >>> len(text) <= stats["chars_packed"] <= 800, GAP_MARKER in text, text.endswith(notice)
+    (True, True, True)
+    >>> text.index("[FILE a_cover.txt]") < text.index("[FILE z_notice.txt]")  # listing order kept
+    True
+    >>> pack_ranked(docs, 10**6)[0] == "\n\n".join(f"[FILE {n}]\n{t}" for n, t in docs)
+    True
+    >>> pack_ranked([], 100)
+    ('', {'chunks_total': 0, 'chunks_packed': 0, 'files_packed': 0, 'chars_packed': 0})
+    """
+    pieces_by_doc = [chunk_text(text) for _, text in documents]
+    chunks: List[Tuple[int, int, str]] = []  # (doc_idx, chunk_idx, text)
+    for d, pieces in enumerate(pieces_by_doc):
+        for c, piece in enumerate(pieces):
+            chunks.append((d, c, piece))
+
+    index = Bm25Index([tokenize(piece) for _, _, piece in chunks])
+    scores = index.scores(query_weights())
+    # best first; ties (incl. all-zero) keep listing order
+    order = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+
+    gap = len(GAP_MARKER) + 1
+    chosen: Dict[int, List[int]] = defaultdict(list)
+    total = 0
+    for i in order:
+        d, c, piece = chunks[i]
+        cost = len(piece) + 1 + gap
+        if not chosen.get(d):
+            cost += len(f"[FILE {documents[d][0]}]\n") + gap  # header + trailing gap
+        if total + cost > budget:
+            continue
+        chosen[d].append(c)
+        total += cost
+
+    parts: List[str] = []
+    for d, (name, _) in enumerate(documents):
+        if d not in chosen:
+            continue
+        pieces = pieces_by_doc[d]
+        lines: List[str] = []
+        prev = -1
+        for c in sorted(chosen[d]):
+            if c != prev + 1:
+                lines.append(GAP_MARKER)
+            lines.append(pieces[c])
+            prev = c
+        if prev != len(pieces) - 1:
+            lines.append(GAP_MARKER)
+        parts.append(f"[FILE {name}]\n" + "\n".join(lines))
+
+    stats = {
+        "chunks_total": len(chunks),
+        "chunks_packed": sum(len(v) for v in chosen.values()),
+        "files_packed": len(chosen),
+        "chars_packed": total,
+    }
+    return "\n\n".join(parts), stats
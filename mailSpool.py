@@ -0,0 +1,195 @@
+# mailSpool.py
+# Durable outbox for client emails (stdlib SQLite), so a failed send is
+# retried later instead of being lost, and a re-run never double-sends.
+# - every message has an idempotency key (case id + event type + phase);
+#   enqueue() of a key the spool has already seen is a no-op
+# - pending messages are retried with exponential backoff until they are
+#   sent, refused permanently, or run out of attempts
+# - claim_due() leases what it hands out (SEND_LEASE_S), so several workers
+#   can drain one spool; only a lapsed lease (a drainer that died mid-send)
+#   is claimed again
+# - SpoolDrainer drains the spool through a MessageSender.Outbox on a
+#   background thread, off the pipeline's critical path
+
+import time
+import email
+import random
+import threading
+from typing import List, Optional
+
+from sqliteStore import SqliteStore
+
+BACKOFF_BASE_S  = 30          # first retry after ~30s, then 60s, 120s, ...
+BACKOFF_MAX_S   = 60 * 60     # never wait more than an hour between tries
+MAX_ATTEMPTS    = 8           # then the message is marked "failed"
+DRAIN_POLL_S    = 1.0         # how often the background drainer looks for due messages
+DRAIN_BATCH     = 100         # messages handed to the outbox per drain pass
+SEND_LEASE_S    = 15 * 60     # a "sending" claim older than this is a dead drainer's; offer it again
+
+def backoff_s(attempts: int) -> float:
+    """Delay before retry number `attempts` (1-based), with +/-10% jitter."""
+    delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.9, 1.1)
+
+class MailSpool(SqliteStore):
+    def __init__(self, path: str):
+        super().__init__(path)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " key TEXT PRIMARY KEY,"
+                " to_addr TEXT NOT NULL,"
+                " subject TEXT NOT NULL,"
+                " raw TEXT NOT NULL,"
+                " status TEXT NOT NULL,"          # pending | sending | sent | failed
+                " attempts INTEGER NOT NULL,"
+                " next_attempt_at REAL NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " sent_at REAL,"
+                " last_error TEXT,"
+                " claimed_until REAL)"            # lease end while status = 'sending'
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+            if "claimed_until" not in columns:  # spool from before leases
+                conn.execute("ALTER TABLE messages ADD COLUMN claimed_until REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_due ON messages(status, next_attempt_at)")
+
+    def enqueue(self, key: str, message) -> bool:
+        """Spool a message; False if this key was already spooled (pending, sent or failed)."""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO messages (key, to_addr, subject, raw, status, attempts,"
+                " next_attempt_at, created_at) VALUES (?, ?, ?, ?, 'pending', 0, ?, ?)",
+                (key, str(message["To"] or ""), str(message["Subject"] or ""), message.as_string(),
+                 time.time(), time.time()),
+            )
+            return cur.rowcount == 1
+
+    def claim_due(self, limit: int = DRAIN_BATCH, lease_s: float = SEND_LEASE_S) -> List[tuple]:
+        """
+        Lease up to `limit` due messages (status "sending" for `lease_s`);
+        returns [(key, message)]. Messages another drainer is sending are
+        left alone until its lease lapses.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT key, raw FROM messages WHERE (status = 'pending' AND next_attempt_at <= ?)"
+                " OR (status = 'sending' AND (claimed_until IS NULL OR claimed_until <= ?))"
+                " ORDER BY next_attempt_at LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            conn.executemany("UPDATE messages SET status = 'sending', claimed_until = ? WHERE key = ?",
+                             [(now + lease_s, k) for k, _ in rows])
+        return [(key, email.message_from_string(raw)) for key, raw in rows]
+
+    def record(self, result: dict) -> None:
+        """Apply one Outbox.flush() result to its spooled message."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM messages WHERE key = ?", (result["key"],)).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            if result["ok"]:
+                conn.execute(
+                    "UPDATE messages SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL,"
+                    " claimed_until = NULL WHERE key = ?",
+                    (attempts, now, result["key"]),
+                )
+            elif result.get("permanent") or attempts >= MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE messages SET status = 'failed', attempts = ?, last_error = ?, claimed_until = NULL"
+                    " WHERE key = ?",
+                    (attempts, result.get("error"), result["key"]),
+                )
+            else:
+                conn.execute(
+                    "UPDATE messages SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?,"
+                    " claimed_until = NULL WHERE key = ?",
+                    (attempts, now + backoff_s(attempts), result.get("error"), result["key"]),
+                )
+
+    def next_due_at(self) -> Optional[float]:
+        """When the next message can be claimed: a pending retry, or a lapsing send lease."""
+        row = self._conn().execute(
+            "SELECT MIN(CASE WHEN status = 'pending' THEN next_attempt_at ELSE COALESCE(claimed_until, 0) END)"
+            " FROM messages WHERE status IN ('pending', 'sending')"
+        ).fetchone()
+        return row[0]
+
+    def counts(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+class SpoolDrainer:
+    """
+    Sends due spooled messages through `outbox` (a MessageSender.Outbox):
+    drain_once() for one pass, or start()/stop() for a background thread.
+    Results of every pass are collected in .results.
+    """
+    def __init__(self, spool: MailSpool, outbox, poll_s: float = DRAIN_POLL_S):
+        self.spool = spool
+        self.outbox = outbox
+        self.poll_s = poll_s
+        self.results: List[dict] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # one pass at a time
+
+    def drain_once(self) -> List[dict]:
+        with self._lock:
+            claimed = self.spool.claim_due()
+            if not claimed:
+                return []
+            for key, message in claimed:
+                self.outbox.queue(message, key=key)
+            results = self.outbox.flush()
+            for result in results:
+                self.spool.record(result)
+            self.results.extend(results)
+            return results
+
+    def wake(self) -> None:
+        """Drain now rather than at the next poll (e.g. right after enqueue)."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.drain_once()
+            except Exception as e:
+                print(f"⚠️ Mail spool drain failed: {e}")
+            self._wake.wait(self.poll_s)
+            self._wake.clear()
+
+    def start(self) -> "SpoolDrainer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mail-spool-drainer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, final_pass: bool = True) -> List[dict]:
+        """Stop the thread (after one last pass over due messages); returns all results."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if final_pass:
+            self.drain_once()
+        return self.results
+
+    def drain_until_idle(self, max_wait_s: float = None) -> List[dict]:
+        """Foreground drain: keep going (sleeping through backoff) until nothing is pending."""
+        deadline = None if max_wait_s is None else time.time() + max_wait_s
+        while True:
+            self.drain_once()
+            due = self.spool.next_due_at()
+            if due is None:
+                return self.results
+            wait = max(0.0, due - time.time())
+            if deadline is not None and time.time() + wait > deadline:
+                return self.results
+            time.sleep(min(wait, BACKOFF_MAX_S))
@@ -1,21 +1,37 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 //Global styles and gradient
 import './index.css'; 
 
 import LitigationColumn from './components/LitigationColumn';
 import './components/LitigationColumn.css'; 
 
+//Define the order of the columns
+const litigationPhases = ["Discovery", "Settlement Discussion", "Pre-Trial", "Trial"];
+
+//Fetch one shard of compact cards
+const fetchCards = (shard) =>
+  fetch(`/feed/${shard}`).then(response => {
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+  });
+
 function App() {
   //State to hold the array of case data
   const [cases, setCases] = useState([]);
-  
-  //Define the order of the columns
-  const litigationPhases = ["Discovery", "Settlement Discussion", "Pre-Trial", "Trial"];
+  //Card shards of each phase from the feed index, and how many are loaded
+  const [phaseShards, setPhaseShards] = useState({});
+  const [loadedShards, setLoadedShards] = useState({});
+  //Phases with a shard fetch in flight, so a quick double click can't load one twice
+  const loadingPhases = useRef({});
 
   //useEffect hook runs once when the component first mounts
   useEffect(() => {
-    //Fetch the data from master.json located in the 'public' folder
-    fetch('/master.json') // Correct path for files in the public folder
+    //Fetch the feed index Donna exports into the 'public' folder. It is tiny and
+    //changes on every export, so always revalidate it; the shards it points at
+    //have content hashes in their names and can be cached by the browser.
+    fetch('/feed/index.json', { cache: 'no-cache' })
       .then(response => {
         //Check if the request was successful
         if (!response.ok) {
@@ -24,9 +40,16 @@ function App() {
         //Parse the JSON data from the response
         return response.json();
       })
-      .then(data => {
-        // Update the 'cases' state with the fetched data
-        setCases(data);
+      .then(index => {
+        //Fetch only the first shard of cards of each phase the board shows
+        const phases = index.phases.filter(p => litigationPhases.includes(p.phase) && p.cards.length > 0);
+        setPhaseShards(Object.fromEntries(phases.map(p => [p.phase, p.cards])));
+        setLoadedShards(Object.fromEntries(phases.map(p => [p.phase, 1])));
+        return Promise.all(phases.map(p => fetchCards(p.cards[0])));
+      })
+      .then(shards => {
+        // Update the 'cases' state with the fetched cards
+        setCases(shards.flat());
       })
       .catch(error => {
         // Log any errors that occur during fetching or parsing
@@ -35,6 +58,20 @@ function App() {
       });
   }, []); // The empty dependency array [] means this effect runs only once
 
+  // Function passed down to LitigationColumn to fetch the phase's next shard of cards
+  const handleLoadMore = (phase) => {
+    if (loadingPhases.current[phase]) return;
+    const next = loadedShards[phase] || 0;
+    const shard = (phaseShards[phase] || [])[next];
+    if (!shard) return;
+    loadingPhases.current[phase] = true;
+    setLoadedShards(current => ({ ...current, [phase]: next + 1 }));
+    fetchCards(shard)
+      .then(cards => setCases(currentCases => [...currentCases, ...cards]))
+      .catch(error => console.error("Error fetching case data:", error))
+      .finally(() => { loadingPhases.current[phase] = false; });
+  };
+
   // Function passed down to CaseCard to update a case's status
   const handleUpdateStatus = (caseId, newStatus) => {
     setCases(currentCases =>
@@ -70,6 +107,8 @@ function App() {
               title={phase} // The title of the column
               cases={casesForPhase} // The filtered list of cases for this column
               onUpdateStatus={handleUpdateStatus} // Pass the update function down
+              hasMore={(loadedShards[phase] || 0) < (phaseShards[phase] || []).length}
+              onLoadMore={() => handleLoadMore(phase)}
             />
           );
         })}
@@ -3,6 +3,8 @@ import './CaseCard.css';
 
 function CaseCard({ caseData, onUpdateStatus }) {
   const [isExpanded, setIsExpanded] = useState(false);
+  // Full case details live in their own feed shard, fetched on first expand
+  const [details, setDetails] = useState(null);
 
   // Helper function to get the correct CSS class for the status border
   const getStatusClass = (status) => {
@@ -24,11 +26,20 @@ function CaseCard({ caseData, onUpdateStatus }) {
 
   // Flips the isExpanded state
   const toggleExpand = () => {
+    if (!isExpanded && !details && caseData.detail) {
+      fetch(`/feed/${caseData.detail}`)
+        .then(response => response.json())
+        .then(setDetails)
+        .catch(error => console.error("Error fetching case details:", error));
+    }
     setIsExpanded(!isExpanded);
   };
 
+  // The card's own fields (e.g. an updated status) win over the fetched shard
+  const fullCase = { key_findings: [], ...details, ...caseData };
+
   // Get the checklist for the case's *current* phase
-  const currentPhaseChecklist = caseData.checklist?.[caseData.litigation_phase] || {};
+  const currentPhaseChecklist = fullCase.checklist?.[fullCase.litigation_phase] || {};
 
   return (
     <div className={`case-card ${getStatusClass(caseData.status)}`}>
@@ -50,12 +61,17 @@ function CaseCard({ caseData, onUpdateStatus }) {
       </div>
 
       {/* DROPDOWN CONTENT - Renders only when isExpanded is true */}
-      {isExpanded && (
+      {isExpanded && caseData.detail && !details && (
+        <div className="card-dropdown-content">
+          <p>Loading case details...</p>
+        </div>
+      )}
+      {isExpanded && (details || !caseData.detail) && (
         <div className="card-dropdown-content">
           <div className="card-section">
             <strong>Key Findings:</strong>
             <ul>
-              {caseData.key_findings.map((finding, index) => (
+              {fullCase.key_findings.map((finding, index) => (
                 <li key={index}>{finding}</li>
               ))}
             </ul>
@@ -63,20 +79,20 @@ function CaseCard({ caseData, onUpdateStatus }) {
 
           <div className="card-section">
             <strong>Medical History:</strong>
-            <p>{caseData.medical_history_summary}</p>
+            <p>{fullCase.medical_history_summary}</p>
           </div>
 
           <div className="card-section">
             <strong>HIPAA Necessity:</strong>
-            <p>{caseData.hipaa_necessity}</p>
+            <p>{fullCase.hipaa_necessity}</p>
           </div>
 
           {/* Relevant Cases Section */}
           <div className="card-section relevant-cases-section">
             <strong>Relevant Cases:</strong>
-            {caseData.relevant_cases && caseData.relevant_cases.length > 0 ? (
+            {fullCase.relevant_cases && fullCase.relevant_cases.length > 0 ? (
               <ul>
-                {caseData.relevant_cases.map((rc, index) => (
+                {fullCase.relevant_cases.map((rc, index) => (
                   <li key={index}>
                     <p><strong>{rc.case_name}</strong> - {rc.citation}</p>
                     <p>Court: {rc.court}</p>
@@ -91,9 +107,9 @@ function CaseCard({ caseData, onUpdateStatus }) {
 
             {/* This block is now corrected with 'fc' */}
             <strong>Federal Cases:</strong>
-            {caseData.federal_cases && caseData.federal_cases.length > 0 ? (
+            {fullCase.federal_cases && fullCase.federal_cases.length > 0 ? (
               <ul>
-                {caseData.federal_cases.map((fc, index) => ( 
+                {fullCase.federal_cases.map((fc, index) => ( 
                   <li key={index}>
                     <p><strong>{fc.case_name}</strong> - {fc.citation}</p>
                     <p>Court: {fc.court}</p>
@@ -105,7 +121,7 @@ function CaseCard({ caseData, onUpdateStatus }) {
             ) : (
               <p>No relevant federal cases found.</p>
             )}
-            {caseData.notes && <p className="case-notes">Notes: {caseData.notes}</p>}
+            {fullCase.notes && <p className="case-notes">Notes: {fullCase.notes}</p>}
           </div>
 
           {/* Dynamic Checklist Section */}
@@ -124,7 +140,7 @@ function CaseCard({ caseData, onUpdateStatus }) {
 
 
           <div className="card-footer">
-            <strong>Political Reading:</strong> {caseData.political_reading}
+            <strong>Political Reading:</strong> {fullCase.political_reading}
           </div>
 
           {/* This logic now cleans the data, just like getStatusClass */}
@@ -2,7 +2,7 @@ import React from 'react';
 import CaseCard from './CaseCard';
 import './LitigationColumn.css';
 
-function LitigationColumn({ title, cases, onUpdateStatus }) {
+function LitigationColumn({ title, cases, onUpdateStatus, hasMore, onLoadMore }) {
   return (
     <div className="litigation-column">
       <h2 className="column-title">{title}</h2>
@@ -18,6 +18,11 @@ function LitigationColumn({ title, cases, onUpdateStatus }) {
         ) : (
           <p className="empty-column-message">No cases in this phase.</p>
         )}
+        {hasMore && (
+          <button className="load-more-button" onClick={onLoadMore}>
+            Load more cases
+          </button>
+        )}
       </div>
     </div>
   );
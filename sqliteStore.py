@@ -0,0 +1,50 @@
+# sqliteStore.py
+# Connection handling shared by the stdlib-SQLite stores (caseStore.CaseStore,
+# mailSpool.MailSpool, diskCache.DiskCache):
+# - one connection per thread (sqlite3 connections aren't shared across
+#   threads), opened lazily, in autocommit mode with a WAL journal so readers
+#   never block the writer and several processes can use one file
+# - _transaction(): BEGIN IMMEDIATE, so a writer takes the lock up front and
+#   concurrent writers queue (timeout 30s) instead of failing mid-transaction
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_S = 30
+
+class SqliteStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_S, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close this thread's connection (others close when their thread's local goes away)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
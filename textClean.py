@@ -0,0 +1,137 @@
+# textClean.py
+# Noise stripping for text extracted from PDFs. PdfReader.extract_text()
+# output carries repeated page headers/footers, Bates numbers, fax banners,
+# page numbers, whitespace runs and words hyphenated across line breaks, all
+# of which count against MAX_CHARS_PER_FILE and the prompt budget.
+# clean_pages() makes one pass over the lines with precompiled patterns:
+#   - whitespace runs collapse to one space, blank-line runs to one blank line
+#   - whole-line Bates numbers (prefix + 6-10 digits, or "Bates No. ...")
+#     are dropped anywhere on the page; "SMITH 000123" with a space only
+#     from the header/footer zone, so "FL 32801" in an address survives
+#   - page numbers and fax banners are dropped from the header/footer zone;
+#     a line that is only a number counts as a page number only when it is
+#     the first (or last) line of the page and those numbers count up one per
+#     page across enough pages, so amounts and years near the page edges survive
+#   - header/footer lines repeated on enough pages (digits ignored, so
+#     "Page 3 of 9" matches "Page 4 of 9") are kept only where first seen
+#   - "exami-\nnation" is re-joined to "examination"; "well-\nknown" keeps
+#     its hyphen ("well-known") when either side is a common compound part
+
+import re
+from collections import Counter
+from typing import List, Tuple
+
+ZONE_LINES           = 3     # non-blank lines at the top/bottom of a page treated as header/footer
+REPEAT_MIN_PAGES     = 2     # a header/footer line must recur on at least this many pages ...
+REPEAT_MIN_FRACTION  = 0.5   # ... and on at least this share of the pages
+
+_SPACE_RE    = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+_DIGITS_RE   = re.compile(r"\d+")
+_BLANKS_RE   = re.compile(r"\n{3,}")
+_HYPHEN_RE   = re.compile(r"([A-Za-z]+)([-\u00ad])\n([a-z]+)")
+_BATES_RE    = re.compile(
+    r"^(?:(?i:bates)\s*(?:(?i:no)\.?|#)?\s*[A-Z0-9][A-Z0-9_-]{0,11}[ _-]?\d{5,10}|[A-Z][A-Z0-9]{1,11}[_-]?\d{6,10})$"
+)
+_ZONE_BATES_RE = re.compile(r"^[A-Z][A-Z0-9]{1,11} \d{6,10}$")
+_PAGE_NO_RE  = re.compile(
+    r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|p(?:g|age)?\.?\s*\d+|-\s*\d+\s*-|\d+\s*(?:of|/)\s*\d+)$",
+    re.IGNORECASE,
+)
+_BARE_NO_RE  = re.compile(r"^\d{1,4}$")
+_FAX_RE      = re.compile(r"\b(?:fax|facsimile|telecopy)\b", re.IGNORECASE)
+_FAX_MARK_RE = re.compile(r"\d{1,2}:\d{2}|\bp(?:age)?\.?\s*\d+|\d{1,4}\s*/\s*\d{1,4}", re.IGNORECASE)
+
+# A line-end hyphen is a real one (not a line-break split) when either
+# fragment is a common compound part: "well-known", "follow-up", "long-term"
+_COMPOUND_HEADS = frozenset({
+    "all", "anti", "co", "cross", "ex", "follow", "full", "half", "high", "left", "long",
+    "low", "multi", "non", "part", "post", "pre", "right", "self", "semi", "short",
+    "third", "well", "x",
+})
+_COMPOUND_TAILS = frozenset({
+    "based", "day", "free", "in", "like", "month", "off", "old", "out", "related",
+    "term", "time", "up", "week", "year",
+})
+
+def _join_hyphenated(m: "re.Match") -> str:
+    head, mark, tail = m.group(1), m.group(2), m.group(3)
+    if mark == "-" and (head.lower() in _COMPOUND_HEADS or tail in _COMPOUND_TAILS):
+        return f"{head}-{tail}"
+    return head + tail
+
+def _line_key(line: str) -> str:
+    # a bare number only repeats as itself; "#" would match every amount and year
+    if _BARE_NO_RE.match(line):
+        return line
+    return _DIGITS_RE.sub("#", line.lower())
+
+def _is_zone_noise(line: str) -> bool:
+    if _PAGE_NO_RE.match(line):
+        return True
+    return bool(_FAX_RE.search(line) and _FAX_MARK_RE.search(line))
+
+def _zone(lines: List[str]) -> set:
+    """Indexes of the first/last ZONE_LINES non-blank lines."""
+    filled = [i for i, line in enumerate(lines) if line]
+    return set(filled[:ZONE_LINES]) | set(filled[-ZONE_LINES:])
+
+def _page_numbers(found: List[Tuple[int, int, int]], need: float) -> set:
+    """(page, line) of bare numbers at one page edge, if they run like page numbers."""
+    # page numbers go up by one per page (pages without one may sit in between)
+    if len(found) < need or any(n2 - n1 != p2 - p1 for (p1, _, n1), (p2, _, n2) in zip(found, found[1:])):
+        return set()
+    return {(page, i) for page, i, _ in found}
+
+def clean_pages(pages: List[str]) -> str:
+    r"""
+    Cleaned text of a document's pages, joined with newlines.
+    Checks (python -m doctest textClean.py):
+
+    >>> clean_pages(["Invoice\nTotal billed\n1500", "Deposition taken\nin\n2019"])
+    'Invoice\nTotal billed\n1500\nDeposition taken\nin\n2019'
+    >>> clean_pages(["Fee\n1500", "Filed\n2019", "Hearing\n2020"])  # amounts and years survive
+    'Fee\n1500\nFiled\n2019\nHearing\n2020'
+    >>> clean_pages(["1\nFirst page body", "2\nSecond page body\n40", "3\nThird page body"])
+    'First page body\nSecond page body\n40\nThird page body'
+    >>> clean_pages(["Body one\nPage 1 of 2", "Body two\nPage 2 of 2"])
+    'Body one\nBody two'
+    """
+    split: List[List[str]] = []
+    zones: List[set] = []
+    counts: Counter = Counter()
+    tops: List[Tuple[int, int, int]] = []
+    bottoms: List[Tuple[int, int, int]] = []
+    for p, page in enumerate(pages):
+        lines = [_SPACE_RE.sub(" ", line).strip() for line in page.split("\n")]
+        zone = _zone(lines)
+        split.append(lines)
+        zones.append(zone)
+        counts.update({_line_key(lines[i]) for i in zone})
+        filled = [i for i, line in enumerate(lines) if line]
+        for edge, found in ((filled[:1], tops), (filled[-1:], bottoms)):
+            if edge and _BARE_NO_RE.match(lines[edge[0]]):
+                found.append((p, edge[0], int(lines[edge[0]])))
+
+    need = max(REPEAT_MIN_PAGES, REPEAT_MIN_FRACTION * len(pages))
+    repeated = {key for key, n in counts.items() if n >= need}
+    page_numbers = _page_numbers(tops, need) | _page_numbers(bottoms, need)
+    seen = set()
+    out: List[str] = []
+    for p, (lines, zone) in enumerate(zip(split, zones)):
+        for i, line in enumerate(lines):
+            if line and _BATES_RE.match(line):
+                continue
+            if (p, i) in page_numbers:
+                continue
+            if i in zone:
+                if _is_zone_noise(line) or _ZONE_BATES_RE.match(line):
+                    continue
+                key = _line_key(line)
+                if key in repeated:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+            out.append(line)
+
+    text = _HYPHEN_RE.sub(_join_hyphenated, "\n".join(out))
+    return _BLANKS_RE.sub("\n\n", text).strip()
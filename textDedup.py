@@ -0,0 +1,139 @@
+# textDedup.py
+# Near-duplicate detection for extracted case files. Case folders hold the
+# same document several times (re-scans, "v2" copies, an email attachment next
+# to the original); each copy would otherwise be packed into the prompt.
+# Every text is reduced to a bottom-k MinHash sketch of its word shingles;
+# candidates are found through an inverted index on sketch values (so a new
+# file is compared only with files it shares hashes with), and a file whose
+# estimated Jaccard similarity with an earlier file reaches DEDUP_THRESHOLD,
+# and whose word count is within MIN_LENGTH_RATIO of it, is dropped. The
+# first copy in listing order is kept.
+# The bar is near-exact on purpose: templated filings (a deposition notice
+# for the Plaintiff and one for the Defendant) share ~90% of their shingles
+# but are separate evidence, so only re-scans and lightly edited copies go.
+
+import re
+import zlib
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+SHINGLE_WORDS   = 5      # words per shingle
+SKETCH_SIZE     = 128    # bottom-k MinHash sketch size (error ~0.02 near the threshold)
+DEDUP_THRESHOLD = 0.95   # estimated Jaccard similarity that counts as a duplicate
+MIN_LENGTH_RATIO = 0.95  # ... and the shorter file has at least this share of the longer one's words
+MIN_SHARED      = 8      # sketch hashes a candidate must share before it's scored
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+_MASK = (1 << 64) - 1
+
+def sketch(text: str) -> List[int]:
+    """Sorted bottom-k hashes of the text's word shingles (case/punctuation/whitespace-insensitive)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return [_h64(" ".join(words))] if words else []
+    # Hash each distinct word once; a shingle is the (process-stable) hash of
+    # its tuple of word hashes, so the per-shingle work stays in C
+    ids = {w: zlib.crc32(w.encode("utf-8")) for w in set(words)}
+    hs = [ids[w] for w in words]
+    shingles = {h & _MASK for h in map(hash, zip(*(hs[j:] for j in range(SHINGLE_WORDS))))}
+    return sorted(shingles)[:SKETCH_SIZE]
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Jaccard estimate from two bottom-k sketches."""
+    if not a or not b:
+        return 0.0
+    k = min(SKETCH_SIZE, len(set(a) | set(b)))
+    union = sorted(set(a) | set(b))[:k]
+    sa, sb = set(a), set(b)
+    return sum(1 for h in union if h in sa and h in sb) / k
+
+class NearDupIndex:
+    r"""
+    Incremental index: add() each text in listing order.
+    Checks (python -m doctest textDedup.py):
+
+    >>> notice = " ".join(f"Deposition notice item {i} is set for May {i % 28 + 1} at counsel's office." for i in range(40))
+    >>> idx = NearDupIndex()
+    >>> idx.add("notice.pdf", notice) is None
+    True
+    >>> idx.add("notice_rescan.pdf", notice.upper().replace(" at ", "  at\n"))  # case/whitespace only
+    ('notice.pdf', 1.0)
+    >>> name, sim = idx.add("notice_v2.pdf", notice.replace("item 39 is", "item 39 was"))
+    >>> name, DEDUP_THRESHOLD <= sim < 1.0
+    ('notice.pdf', True)
+    >>> idx.add("bill.pdf", " ".join(f"Invoice line {i}: therapy billed at {100 + i} dollars." for i in range(40))) is None
+    True
+    >>> idx.add("blank.pdf", "") is None, idx.names
+    (True, ['notice.pdf', 'bill.pdf'])
+
+    Notices from one template that differ only in deponent and date are both kept:
+
+    >>> def depo(deponent, date):
+    ...     return (f"NOTICE OF TAKING DEPOSITION. PLEASE TAKE NOTICE that the undersigned will take the "
+    ...             f"deposition of {deponent} on {date} at 10:00 a.m. before a court reporter. "
+    ...             + " ".join(f"Service paragraph {i}: a true copy was e-mailed to all counsel of record." for i in range(25)))
+    >>> idx.add("depo_plaintiff.pdf", depo("JANE DOE, Plaintiff", "March 3, 2025")) is None
+    True
+    >>> idx.add("depo_defendant.pdf", depo("JOHN SMITH, Defendant", "March 17, 2025")) is None
+    True
+    >>> idx.add("excerpt.pdf", notice[: len(notice) // 2]) is None  # a part is not a copy
+    True
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.sketches: List[List[int]] = []
+        self.sizes: List[int] = []   # word counts
+        self.names: List[str] = []
+        self.postings: Dict[int, List[int]] = defaultdict(list)
+
+    def add(self, name: str, text: str) -> Optional[Tuple[str, float]]:
+        """
+        Returns (name of the kept file it duplicates, similarity) and leaves
+        the index unchanged, or None after indexing `text` as a new file.
+        """
+        sk = sketch(text)
+        if not sk:
+            return None
+        size = len(_WORD_RE.findall(text.lower()))
+        shared: Dict[int, int] = defaultdict(int)
+        for h in sk:
+            for doc in self.postings.get(h, ()):
+                shared[doc] += 1
+        need = min(MIN_SHARED, len(sk))
+        best: Optional[Tuple[str, float]] = None
+        for doc, n in shared.items():
+            if n < need and n < len(self.sketches[doc]):
+                continue
+            if min(size, self.sizes[doc]) < MIN_LENGTH_RATIO * max(size, self.sizes[doc]):
+                continue
+            sim = similarity(sk, self.sketches[doc])
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (self.names[doc], sim)
+        if best is not None:
+            return best
+
+        doc = len(self.sketches)
+        self.sketches.append(sk)
+        self.sizes.append(size)
+        self.names.append(name)
+        for h in sk:
+            self.postings[h].append(doc)
+        return None
+
+def dedup_notes(dropped: List[Tuple[str, str, float, int]], total_files: int, limit: int = 10) -> List[str]:
+    """Run-note lines for (dropped_name, kept_name, similarity, chars) rows."""
+    if not dropped:
+        return []
+    saved = sum(chars for _, _, _, chars in dropped)
+    notes = [f"Dedup: dropped {len(dropped)} of {total_files} files as near-duplicates ({saved} chars saved)."]
+    for name, kept, sim, _ in dropped[:limit]:
+        notes.append(f"Dropped near-duplicate '{name}' (~{sim:.0%} similar to '{kept}').")
+    if len(dropped) > limit:
+        notes.append(f"... and {len(dropped) - limit} more near-duplicates.")
+    return notes